@@ -37,6 +37,10 @@ class ListOperationTimeout(Exception):
     """Exception raised when list operations take too long"""
     pass
 
+class _NoMaterialChange(Exception):
+    """Raised during push analysis when only non-material differences (e.g. timestamps) were found"""
+    pass
+
 def timeout_handler(signum, frame):
     """Signal handler for timeout"""
     raise ListOperationTimeout("List operation timed out")
@@ -116,6 +120,7 @@ ATTACHMENTS_VAULT_DIR = os.path.join(VAULT_DIR, ATTACHMENTS_DIR_NAME)
 ARCHIVED_DIR = os.path.join(VAULT_DIR, "Archived")
 TRASHED_DIR = os.path.join(VAULT_DIR, "Trashed")
 CACHE_FILE = "keep_state.json"
+CACHE_META_FILE = "keep_state.meta.json" # Sidecar: last clean pull checkpoint + Keep version it belongs to
 JSON_OUTPUT_FILE = "keep_notes_pulled.json" # For debugging pull data
 DEBUG = False
 MAX_FILENAME_LENGTH = 90
@@ -125,6 +130,9 @@ RESERVED_NAMES = {
     "LPT1", "LPT2", "LPT3", "LPT4", "LPT5", "LPT6", "LPT7", "LPT8", "LPT9"
 }
 CONFIG_FILE = "config.json"
+TOKEN_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "lawa-tu", "tokens")
+DEFAULT_AUTH_TTL_HOURS = 0.75 # Stays inside the ~1h lifetime of the Google OAuth token
+SYNC_CHECKPOINT_MARGIN = timedelta(minutes=15) # Slack for editing devices whose clocks lag behind Keep's newest timestamp
 
 # --- Sync Log Constants ---
 SYNC_LOG_FILENAME = "_Sync_Log.md"
@@ -221,27 +229,129 @@ def get_master_token(email):
             logging.warning(f"Could not store master token in keyring: {e}", exc_info=DEBUG)
     return master_token
 
+def _token_cache_path(email):
+    return os.path.join(TOKEN_CACHE_DIR, f"{hashlib.sha256(email.lower().encode('utf-8')).hexdigest()}.json")
+
+def load_token_cache(email):
+    """
+    Returns the cached OAuth session ({'auth_token', 'device_id', 'expires_at'}) for email, or None if missing/expired.
+    The master token itself stays in keyring/.env; only the derived, short-lived auth token is cached.
+    """
+    cache_path = _token_cache_path(email)
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if datetime.fromisoformat(cached['expires_at']) <= datetime.now(timezone.utc):
+            logging.info("Cached auth session expired. Re-authenticating.")
+            return None
+        if not cached.get('auth_token') or not cached.get('device_id'):
+            return None
+        return cached
+    except (json.JSONDecodeError, IOError, KeyError, ValueError, TypeError) as e: # TypeError: non-string or tz-less expires_at
+        logging.warning(f"Could not read auth session cache: {e}. Re-authenticating.")
+    return None
+
+def save_token_cache(email, auth_token, device_id, expires_at):
+    """Writes the auth session cache with owner-only permissions. Never logs the token."""
+    cache_path = _token_cache_path(email)
+    try:
+        os.makedirs(TOKEN_CACHE_DIR, mode=0o700, exist_ok=True)
+        os.chmod(TOKEN_CACHE_DIR, 0o700) # makedirs leaves an existing directory's mode alone
+        fd = os.open(cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'auth_token': auth_token, 'device_id': device_id, 'expires_at': expires_at.isoformat()}, f)
+        os.chmod(cache_path, 0o600)
+        logging.debug(f"Saved auth session cache to {cache_path}.")
+    except OSError as e:
+        logging.warning(f"Could not save auth session cache: {e}", exc_info=DEBUG)
+
+def invalidate_token_cache(email):
+    try:
+        os.remove(_token_cache_path(email))
+        logging.info("Invalidated cached auth session.")
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logging.warning(f"Could not remove auth session cache: {e}", exc_info=DEBUG)
+
 # --- Cache Functions ---
+# Optional: orjson (de)serializes the cached Keep state much faster than the json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 def load_cached_state():
     if os.path.exists(CACHE_FILE):
         try:
-            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            with open(CACHE_FILE, 'rb') as f:
                 logging.info(f"Loading cached state from {CACHE_FILE}...")
-                state = json.load(f)
-                return state
-        except (json.JSONDecodeError, IOError) as e:
+                data = f.read()
+            state = orjson.loads(data) if orjson else json.loads(data)
+            return state
+        except (ValueError, IOError) as e: # orjson.JSONDecodeError and json.JSONDecodeError are ValueErrors
             logging.warning(f"Error loading cached state: {e}. Performing a full sync.", exc_info=DEBUG)
     return None
 
-def save_cached_state(keep):
+# Set after every successful keep.sync(); main() persists the state once at the end of the run
+_cache_dirty = False
+
+def mark_cache_dirty():
+    global _cache_dirty
+    _cache_dirty = True
+
+def load_sync_checkpoint(state):
+    """Returns the last clean pull time (aware UTC) saved next to the cached state, or None if missing/stale."""
+    if not state or not os.path.exists(CACHE_META_FILE):
+        return None
+    try:
+        with open(CACHE_META_FILE, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('server_version') != state.get('keep_version'):
+            logging.warning(f"Sync checkpoint in {CACHE_META_FILE} does not match cached state version. Ignoring checkpoint.")
+            return None
+        checkpoint = datetime.fromisoformat(meta['last_sync_iso'].replace('Z', '+00:00'))
+        logging.info(f"Loaded sync checkpoint: {meta['last_sync_iso']}")
+        return checkpoint
+    except (json.JSONDecodeError, IOError, KeyError, ValueError, AttributeError) as e:
+        logging.warning(f"Error loading sync checkpoint: {e}. Ignoring checkpoint.", exc_info=DEBUG)
+    return None
+
+def save_cached_state(keep, last_sync_iso=None):
     try:
         state = keep.dump()
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(state, f)
+        payload = orjson.dumps(state) if orjson else json.dumps(state, separators=(',', ':')).encode('utf-8')
+        tmp_cache_file = CACHE_FILE + '.tmp'
+        with open(tmp_cache_file, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_cache_file, CACHE_FILE)
+        if last_sync_iso:
+            with open(CACHE_META_FILE, 'w', encoding='utf-8') as f:
+                json.dump({'last_sync_iso': last_sync_iso, 'server_version': state.get('keep_version')}, f, indent=2)
         logging.info(f"Saved state to {CACHE_FILE} for faster future syncs.")
     except Exception as e:
         logging.warning(f"Could not save state to cache file: {e}", exc_info=DEBUG)
 
+# --- Remote Note Index ---
+# {note_id: gnote} map built once per Keep state; invalidated after every keep.sync()
+_id_index_cache = {'map': None}
+
+def get_remote_id_index(keep):
+    """Returns the cached id -> note map for all Keep notes, building it on first use."""
+    if _id_index_cache['map'] is None:
+        _id_index_cache['map'] = {note.id: note for note in keep.all()}
+    return _id_index_cache['map']
+
+def invalidate_remote_id_index():
+    _id_index_cache['map'] = None
+
+def _fast_get(keep, note_id):
+    """Dict lookup in the id index, falling back to keep.get() for notes not yet indexed."""
+    note = get_remote_id_index(keep).get(note_id)
+    return note if note is not None else keep.get(note_id)
+
 def load_backup_state():
     if os.path.exists(BACKUP_STATE_FILE):
         try:
@@ -323,6 +433,24 @@ def unescape_hashtags(text):
     if not text: return text
     return re.sub(r'\\#([^\s#])', r'#\1', text)
 
+# Plain scalars that YAML would read back as something other than the same string
+_YAML_NEEDS_QUOTING_RE = re.compile(
+    r"""^$|^[-?:,\[\]{}#&*!|>'"%@`\s]|\s$|:$|: | #|[\x00-\x1f\x7f-\x9f  ﻿]"""
+    r"""|^(?:true|false|yes|no|on|off|y|n|null|~|=|<<"""
+    r"""|[-+]?(?:\.?\d[\d_]*\.?[\d_]*(?:e[-+]?\d+)?|\.inf|\.nan|0[xob][\da-f_]+|\d[\d_]*(?::[0-5]?\d)+(?:\.\d*)?)"""
+    r"""|\d{4}-\d\d?-\d\d?.*)$""",
+    re.IGNORECASE
+)
+
+def _yaml_escape(value):
+    """Formats a string as a YAML scalar, double-quoting it only when a plain scalar would be misread."""
+    value = str(value)
+    if _YAML_NEEDS_QUOTING_RE.search(value):
+        # JSON strings are valid YAML double-quoted scalars; escape the extra line breaks YAML would fold
+        quoted = json.dumps(value, ensure_ascii=False)
+        return quoted.replace('\x85', '\\x85').replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+    return value
+
 def sanitize_filename(name, note_id):
     if not name: name = f"Untitled_{note_id}"
     sanitized = name.replace('/', '_')
@@ -339,6 +467,14 @@ def sanitize_filename(name, note_id):
     if not sanitized: sanitized = f"Note_{note_id}"
     return f"{sanitized}.md"
 
+def write_markdown_file(filepath, content):
+    """Writes content as UTF-8 in one write via a temp file, then atomically replaces the target."""
+    payload = content.encode('utf-8')
+    tmp_filepath = filepath + '.tmp'
+    with open(tmp_filepath, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_filepath, filepath)
+
 # --- Vault Structure and File Indexing ---
 def create_vault_structure(base_path):
     paths = [base_path, ATTACHMENTS_VAULT_DIR, ARCHIVED_DIR, TRASHED_DIR]
@@ -832,8 +968,12 @@ def convert_note_to_markdown(note_obj, note_data_dict):
 
     return f"---\n{yaml_string.strip()}\n---\n{final_content_string}"
 
-def run_pull(keep, args, counters):
-    """Fetches notes from Google Keep, processes media, and updates/creates local Markdown files."""
+def run_pull(keep, args, counters, sync_checkpoint=None):
+    """Fetches notes from Google Keep, processes media, and updates/creates local Markdown files.
+
+    Notes not updated remotely since sync_checkpoint (last clean pull) that already exist locally are skipped.
+    Returns the newest remote 'updated' timestamp seen (aware UTC), or None if no note had one.
+    """
     logging.info("--- Starting PULL Operation ---")
     create_vault_structure(VAULT_DIR)
     local_notes_index = index_local_notes_for_pull(VAULT_DIR) # {keep_id: {path: str, metadata: dict}}
@@ -841,6 +981,7 @@ def run_pull(keep, args, counters):
     all_expected_attachment_filenames = set() # For cleaning orphaned attachments
 
     pulled_notes_for_json_debug = [] # For saving rawish data if needed
+    newest_remote_update = None # Basis for the next checkpoint: Keep's own timestamps, not this machine's clock
 
     logging.info(f"Processing {len(keep.all())} notes fetched from Google Keep...")
     for note_obj in keep.all():
@@ -853,6 +994,22 @@ def run_pull(keep, args, counters):
             continue
 
         processed_keep_ids_from_remote.add(current_keep_id)
+        remote_updated_dt = note_obj.timestamps.updated.replace(tzinfo=timezone.utc) if note_obj.timestamps.updated else None
+        if remote_updated_dt and (newest_remote_update is None or remote_updated_dt > newest_remote_update):
+            newest_remote_update = remote_updated_dt
+
+        # Incremental fast path: unchanged remotely since the last clean pull and already present locally
+        if sync_checkpoint and not args.force_pull_overwrite and current_keep_id in local_notes_index \
+                and remote_updated_dt and remote_updated_dt <= sync_checkpoint:
+            try:
+                # Still collect attachment filenames so they are not treated as orphans
+                all_expected_attachment_filenames.update(process_note_media(keep, note_obj, {'attachments': []}))
+            except Exception as e_media:
+                logging.error(f"PULL: Error processing media for note {current_keep_id}: {e_media}", exc_info=DEBUG)
+                counters['pull_errors'] += 1
+            counters['pull_skipped_no_change'] += 1
+            continue
+
         logging.debug(f"PULL: Processing Keep note ID: {current_keep_id}, Title: '{note_obj.title}'")
 
         # Create a serializable dict for media processing and potential JSON dump
@@ -1116,6 +1273,7 @@ def run_pull(keep, args, counters):
             logging.error(f"PULL: Error saving debug JSON output: {e_json_dump}", exc_info=DEBUG)
 
     logging.info("--- PULL Operation Finished ---")
+    return newest_remote_update
 
 
 # --- PUSH: Note Comparison and Update Logic ---
@@ -1704,7 +1862,7 @@ def run_push(keep, args, counters):
     # We need a way to quickly find remote notes by ID.
     # keep.all() is fine, but for many notes, an index is better.
     # However, the number of notes is usually manageable for iterating here.
-    remote_notes_index = {note.id: note for note in keep.all()}
+    remote_notes_index = get_remote_id_index(keep)
     logging.debug(f"PUSH: Found {len(remote_notes_index)} notes in Google Keep after initial sync/resume.")
 
     actions_to_perform = [] # Store dicts: {'type': 'create'/'update', 'filepath': ..., 'gnote': ..., ...}
@@ -1726,11 +1884,11 @@ def run_push(keep, args, counters):
             untitled_pattern = re.match(r'^Untitled_[a-f0-9]{11,}\.[a-f0-9]{16}$', base_fn)
             if untitled_pattern:
                 # Keep title empty for untitled notes with ID-based filenames
-                logging.debug(f"  PUSH: Detected untitled note with ID-based filename '{base_fn}', keeping title empty for cleaner remote display")
+                if DEBUG: logging.debug(f"  PUSH: Detected untitled note with ID-based filename '{base_fn}', keeping title empty for cleaner remote display")
             else:
                 # Use filename as title for other files
                 local_metadata['title'] = base_fn
-                logging.debug(f"  PUSH: YAML title empty for {rel_filepath}, using filename as title: '{base_fn}'")
+                if DEBUG: logging.debug(f"  PUSH: YAML title empty for {rel_filepath}, using filename as title: '{base_fn}'")
 
         action_disposition = 'skip_no_decision' # Default
         conflict_details_for_automatic_exit = None
@@ -1755,14 +1913,15 @@ def run_push(keep, args, counters):
                             # No differences detected at all
                             action_disposition = 'skip_no_change'
                             counters['push_skipped_no_change'] += 1
-                            logging.debug(f"  PUSH: No changes detected for {local_keep_id} ('{gnote.title}'). Skipping.")
+                            if DEBUG: logging.debug(f"  PUSH: No changes detected for {local_keep_id} ('{gnote.title}'). Skipping.")
                         elif is_different and not material_changes_detected:
                             # Differences were detected, but the only reason was timestamp_local_newer.
                             # This means the file was likely just touched, not materially edited.
                             action_disposition = 'skip_no_material_change'
                             # Use a new counter for this specific skip reason
                             counters['push_skipped_no_material_change'] += 1
-                            logging.debug(f"  PUSH: Differences detected for {local_keep_id} ('{gnote.title}'), but only timestamp is newer ({diff_reasons}). Skipping update to remote as no material change found.") # Changed to debug
+                            if DEBUG: logging.debug(f"  PUSH: Differences detected for {local_keep_id} ('{gnote.title}'), but only timestamp is newer ({diff_reasons}). Skipping update to remote as no material change found.") # Changed to debug
+                            raise _NoMaterialChange()
                         elif args.automatic_sync:
                             # Material changes detected, in automatic sync mode
                             if args.cherry_pick:
@@ -1773,11 +1932,11 @@ def run_push(keep, args, counters):
 
                             if args.force_push:
                                 action_disposition = 'update_remote'
-                                logging.debug(f"  PUSH (AUTO): --force-push active for {local_keep_id}. Marking for update.")
+                                if DEBUG: logging.debug(f"  PUSH (AUTO): --force-push active for {local_keep_id}. Marking for update.")
                             # Check if local timestamp is valid AND (newer than remote OR remote is missing timestamp)
                             elif local_updated_dt and (remote_updated_dt is None or local_updated_dt > remote_updated_dt):
                                 action_disposition = 'update_remote'
-                                logging.debug(f"  PUSH (AUTO): Local timestamp ({local_updated_dt}) is valid and newer than remote ({remote_updated_dt}). Marking for update.")
+                                if DEBUG: logging.debug(f"  PUSH (AUTO): Local timestamp ({local_updated_dt}) is valid and newer than remote ({remote_updated_dt}). Marking for update.")
                             elif remote_updated_dt and local_updated_dt and remote_updated_dt > local_updated_dt:
                                 # Remote is newer - this is actually the safer choice, so we'll skip instead of exiting
                                 logging.warning(f"  PUSH (AUTO): Material differences found for {local_keep_id} ('{gnote.title}'), but remote timestamp ({remote_updated_dt}) is newer than local ({local_updated_dt}). Skipping push to avoid overwriting newer remote version.")
@@ -1801,7 +1960,7 @@ def run_push(keep, args, counters):
                             # CHOOSE_REMOTE (local updated), CHOOSE_SKIP, DRY_RUN_PROMPT => no remote update action
                         elif args.force_push: # Not cherry-pick, but force specified, AND material differences exist
                             action_disposition = 'update_remote'
-                            logging.debug(f"  PUSH: --force-push specified for {local_keep_id} and material differences found. Marking for update.")
+                            if DEBUG: logging.debug(f"  PUSH: --force-push specified for {local_keep_id} and material differences found. Marking for update.")
                         else: # Material differences exist, not cherry-picking, not forcing. Default logic.
                              remote_updated_dt = gnote.timestamps.updated.replace(tzinfo=timezone.utc) if gnote.timestamps.updated else None
                              local_updated_dt = local_metadata.get('updated_dt')
@@ -1810,10 +1969,10 @@ def run_push(keep, args, counters):
                              # we push if the local timestamp is same or newer. Remote being strictly newer is a conflict.
                              if local_updated_dt and remote_updated_dt and local_updated_dt >= remote_updated_dt:
                                  action_disposition = 'update_remote' # Local timestamp is same or newer
-                                 logging.debug(f"  PUSH: Material differences found for {local_keep_id}. Local timestamp same or newer. Marking for update.")
+                                 if DEBUG: logging.debug(f"  PUSH: Material differences found for {local_keep_id}. Local timestamp same or newer. Marking for update.")
                              elif not remote_updated_dt and local_updated_dt:
                                   action_disposition = 'update_remote' # Remote has no timestamp, local does (with material diffs).
-                                  logging.debug(f"  PUSH: Material differences found for {local_keep_id}. Remote timestamp missing. Marking for update.")
+                                  if DEBUG: logging.debug(f"  PUSH: Material differences found for {local_keep_id}. Remote timestamp missing. Marking for update.")
                              else:
                                   # Remote is clearly newer by timestamp, or timestamps are missing on both but material diffs exist.
                                   # This is a conflict in non-automatic, non-forced mode.
@@ -1825,7 +1984,7 @@ def run_push(keep, args, counters):
                     else: # Not different
                         action_disposition = 'skip_no_change'
                         counters['push_skipped_no_change'] += 1
-                        logging.debug(f"  PUSH: No changes detected for {local_keep_id} ('{gnote.title}'). Skipping.")
+                        if DEBUG: logging.debug(f"  PUSH: No changes detected for {local_keep_id} ('{gnote.title}'). Skipping.")
                 else: # Local ID exists, but no remote note (deleted in Keep)
                     logging.warning(f"  PUSH: Note ID {local_keep_id} for '{rel_filepath}' exists locally but not in Keep (deleted remotely). Skipping push. Consider removing ID from local file.")
                     counters['push_skipped_deleted_remotely'] += 1
@@ -1851,7 +2010,7 @@ def run_push(keep, args, counters):
                     action_disposition = 'skip_potential_duplicate'
                 else:
                     action_disposition = 'create_new_remote'
-                    logging.info(f"  PUSH: Local file '{rel_filepath}' has no Keep ID. Marked for creation in Keep.")
+                    logging.info("  PUSH: Local file '%s' has no Keep ID. Marked for creation in Keep.", rel_filepath)
 
             # Add to actions based on disposition
             if action_disposition == 'update_remote':
@@ -1863,21 +2022,11 @@ def run_push(keep, args, counters):
                 print(f"AUTOMATIC SYNC ERROR: {conflict_details_for_automatic_exit}", file=sys.stderr)
                 sys.exit(1) # Exit the script
         
+        except _NoMaterialChange:
+            # Normal skip, already counted and logged above; not an analysis error
+            if DEBUG: logging.debug("PUSH: Analysis for %s handled as non-material skip.", rel_filepath)
         except Exception as e_analyze:
-            actual_error_string = str(e_analyze)
-            logging.debug(f"PUSH_EXCEPTION_HANDLER: Caught exception. String form: >>>{actual_error_string}<<<")
-
-            # Check if the error is the specific 'push_skipped_no_material_change' case
-            # which should have already been logged at DEBUG level by line ~1476.
-            # Using 'in' for a more robust check against potential minor string variations (e.g., surrounding quotes if any)
-            if 'push_skipped_no_material_change' in actual_error_string:
-                logging.debug(f"PUSH: Analysis for {rel_filepath} resulted in '{actual_error_string}' status (handled as non-material skip).")
-                # We might not even need to increment push_errors_analysis if this is considered a normal skip.
-                # For now, keeping the counter increment to align with original behavior if an exception truly occurred.
-                # If this path means NO actual error occurred, then the counter increment might be misleading.
-                # However, altering counter logic is out of scope for reducing verbosity here.
-            else:
-                logging.error(f"PUSH: Error analyzing file {rel_filepath} for push: {e_analyze}", exc_info=DEBUG)
+            logging.error(f"PUSH: Error analyzing file {rel_filepath} for push: {e_analyze}", exc_info=DEBUG)
             counters['push_errors_analysis'] += 1
 
 
@@ -1888,15 +2037,18 @@ def run_push(keep, args, counters):
     proceed_with_push = False
 
     if args.dry_run:
-        print("\n--- [Dry Run] PUSH: Potential Remote Changes ---")
-        if creates_planned: print(f"Would create {len(creates_planned)} notes in Keep:")
-        for item in creates_planned: print(f"  - From: {os.path.relpath(item['filepath'], VAULT_DIR)}")
-        if updates_planned: print(f"Would update {len(updates_planned)} notes in Keep:")
-        for item in updates_planned: print(f"  - ID {item['gnote_to_update'].id} from: {os.path.relpath(item['filepath'], VAULT_DIR)}")
+        # Plans can list thousands of notes: buffer the lines and write them to stdout once
+        lines = ["\n--- [Dry Run] PUSH: Potential Remote Changes ---\n"]
+        if creates_planned: lines.append(f"Would create {len(creates_planned)} notes in Keep:\n")
+        for item in creates_planned: lines.append(f"  - From: {os.path.relpath(item['filepath'], VAULT_DIR)}\n")
+        if updates_planned: lines.append(f"Would update {len(updates_planned)} notes in Keep:\n")
+        for item in updates_planned: lines.append(f"  - ID {item['gnote_to_update'].id} from: {os.path.relpath(item['filepath'], VAULT_DIR)}\n")
         # Display cherry-pick dry run info
         if args.cherry_pick and counters['push_cherrypick_dry_run_prompts'] > 0:
-            print(f"Would prompt for cherry-pick decisions on {counters['push_cherrypick_dry_run_prompts']} notes.")
-        print("[Dry Run] No changes will be made to Google Keep.")
+            lines.append(f"Would prompt for cherry-pick decisions on {counters['push_cherrypick_dry_run_prompts']} notes.\n")
+        lines.append("[Dry Run] No changes will be made to Google Keep.\n")
+        sys.stdout.write("".join(lines))
+        sys.stdout.flush()
     elif not total_to_push:
         print("\nPUSH: No notes marked for creation or update in Google Keep.")
         # Report cherry-pick outcomes even if no push happens
@@ -1913,19 +2065,21 @@ def run_push(keep, args, counters):
         if updates_planned: print(f"Will update {len(updates_planned)} notes in Keep.")
         proceed_with_push = True
     else: # Not dry run, not forced, not automatic_sync, and changes exist
-        print("\n--- PUSH: Review Potential Changes to Google Keep ---")
-        if creates_planned: print(f"Will create {len(creates_planned)} notes:")
-        for item in creates_planned: print(f"  - From: {os.path.relpath(item['filepath'], VAULT_DIR)}")
-        if updates_planned: print(f"Will update {len(updates_planned)} notes:")
-        for item in updates_planned: print(f"  - ID {item['gnote_to_update'].id} from: {os.path.relpath(item['filepath'], VAULT_DIR)}")
+        lines = ["\n--- PUSH: Review Potential Changes to Google Keep ---\n"]
+        if creates_planned: lines.append(f"Will create {len(creates_planned)} notes:\n")
+        for item in creates_planned: lines.append(f"  - From: {os.path.relpath(item['filepath'], VAULT_DIR)}\n")
+        if updates_planned: lines.append(f"Will update {len(updates_planned)} notes:\n")
+        for item in updates_planned: lines.append(f"  - ID {item['gnote_to_update'].id} from: {os.path.relpath(item['filepath'], VAULT_DIR)}\n")
         
         # Display cherry-pick outcomes if any happened
         if args.cherry_pick:
-            if counters['push_cherrypick_remote_chosen_local_updated'] > 0: print(f"  (Cherry-pick: {counters['push_cherrypick_remote_chosen_local_updated']} local files were ALREADY updated from remote choice during analysis)")
-            if counters['push_cherrypick_user_skipped'] > 0: print(f"  (Cherry-pick: {counters['push_cherrypick_user_skipped']} notes were SKIPPED by user choice during analysis)")
+            if counters['push_cherrypick_remote_chosen_local_updated'] > 0: lines.append(f"  (Cherry-pick: {counters['push_cherrypick_remote_chosen_local_updated']} local files were ALREADY updated from remote choice during analysis)\n")
+            if counters['push_cherrypick_user_skipped'] > 0: lines.append(f"  (Cherry-pick: {counters['push_cherrypick_user_skipped']} notes were SKIPPED by user choice during analysis)\n")
         
         if counters['push_skipped_conflict_remote_newer'] > 0:
-            print(f"Skipped pushing {counters['push_skipped_conflict_remote_newer']} notes where remote was newer (no --force).")
+            lines.append(f"Skipped pushing {counters['push_skipped_conflict_remote_newer']} notes where remote was newer (no --force).\n")
+        sys.stdout.write("".join(lines))
+        sys.stdout.flush()
 
         confirm = input("Proceed with pushing these changes to Google Keep? (y/N): ")
         if confirm.lower() == 'y':
@@ -1946,15 +2100,15 @@ def run_push(keep, args, counters):
             try:
                 if action['type'] == 'update':
                     gnote_to_update = action['gnote_to_update']
-                    logging.info(f"PUSH: Updating Keep note ID {gnote_to_update.id} from {rel_filepath_log}...")
+                    logging.info("PUSH: Updating Keep note ID %s from %s...", gnote_to_update.id, rel_filepath_log)
                     if update_gnote_from_local_data(gnote_to_update, local_meta, local_content, keep, counters):
                         sync_needed_after_push = True
                         counters['push_updated_remote'] += 1
                     else:
-                        logging.info(f"  PUSH: No actual changes made to remote note {gnote_to_update.id} by update_gnote function.")
+                        logging.info("  PUSH: No actual changes made to remote note %s by update_gnote function.", gnote_to_update.id)
                 
                 elif action['type'] == 'create':
-                    logging.info(f"PUSH: Creating Keep note from {rel_filepath_log}...")
+                    logging.info("PUSH: Creating Keep note from %s...", rel_filepath_log)
                     created_gnote = create_gnote_from_local_data(keep, local_meta, local_content, filepath, counters)
                     if created_gnote:
                         # The new gnote needs an ID from Keep. This requires a sync.
@@ -1976,7 +2130,8 @@ def run_push(keep, args, counters):
             logging.info("PUSH: Performing sync with Google Keep after push operations...")
             try:
                 keep.sync()
-                save_cached_state(keep) # Save state after successful sync
+                invalidate_remote_id_index()
+                mark_cache_dirty() # State is saved once at the end of main()
                 logging.info("PUSH: Sync after push complete.")
             except gkeepapi.exception.SyncException as e_sync_final:
                 logging.error(f"PUSH: Error during final sync after push: {e_sync_final}", exc_info=DEBUG)
@@ -1995,41 +2150,49 @@ def run_push(keep, args, counters):
                 original_local_content = action['local_content_raw'] # Before creation
 
                 if created_gnote.id: # Check if ID was populated by sync
-                    logging.info(f"  PUSH: Updating local file {os.path.relpath(original_filepath)} with new Keep ID: {created_gnote.id}")
+                    logging.info("  PUSH: Updating local file %s with new Keep ID: %s", os.path.relpath(original_filepath), created_gnote.id)
                     try:
-                        # Create new metadata with ID and fresh timestamps from created_gnote
+                        # Build new metadata with ID and fresh timestamps from created_gnote in canonical key order.
                         # Ensure we have a proper metadata structure even for files that started without frontmatter
-                        updated_yaml_metadata = original_local_meta.copy() if original_local_meta else {}
-                        updated_yaml_metadata['id'] = created_gnote.id
-                        updated_yaml_metadata['title'] = created_gnote.title # Use title from Keep
+                        original_local_meta = original_local_meta or {}
+                        updated_yaml_metadata = {
+                            'id': created_gnote.id,
+                            'title': created_gnote.title, # Use title from Keep
+                        }
                         if created_gnote.timestamps.created:
                             dt_utc_created = created_gnote.timestamps.created
                             if LOCAL_TZ:
                                 updated_yaml_metadata['created'] = dt_utc_created.astimezone(LOCAL_TZ).isoformat()
                             else:
                                 updated_yaml_metadata['created'] = dt_utc_created.isoformat().replace('+00:00', 'Z')
+                        elif 'created' in original_local_meta:
+                            updated_yaml_metadata['created'] = original_local_meta['created']
                         if created_gnote.timestamps.updated:
                             dt_utc_updated = created_gnote.timestamps.updated
                             if LOCAL_TZ:
                                 updated_yaml_metadata['updated'] = dt_utc_updated.astimezone(LOCAL_TZ).isoformat()
                             else:
                                 updated_yaml_metadata['updated'] = dt_utc_updated.isoformat().replace('+00:00', 'Z')
-                        
-                        updated_yaml_metadata.pop('updated_dt', None) # Remove parsed dt object
+                        elif 'updated' in original_local_meta:
+                            updated_yaml_metadata['updated'] = original_local_meta['updated']
 
                         # Ensure color in frontmatter reflects actual created note (Keep might default color)
                         updated_yaml_metadata['color'] = created_gnote.color.name.upper()
                         # Ensure labels are from the created note
-                        if created_gnote.labels.all():
-                            updated_yaml_metadata['tags'] = sorted([lbl.name.replace(' ', '_') for lbl in created_gnote.labels.all()])
-                        else:
-                            updated_yaml_metadata.pop('tags', None)
+                        created_labels = list(created_gnote.labels.all())
+                        if created_labels:
+                            updated_yaml_metadata['tags'] = sorted(lbl.name.replace(' ', '_') for lbl in created_labels)
 
                         # Ensure archived and trashed status are added to frontmatter for consistency with PULL
                         updated_yaml_metadata['archived'] = created_gnote.archived
                         updated_yaml_metadata['trashed'] = created_gnote.trashed
                         updated_yaml_metadata['pinned'] = created_gnote.pinned
 
+                        # Carry over any custom user keys; stale 'tags' and the parsed 'updated_dt' object are dropped
+                        for key, value in original_local_meta.items():
+                            if key not in updated_yaml_metadata and key not in ('updated_dt', 'tags'):
+                                updated_yaml_metadata[key] = value
+
                         new_yaml_string = yaml.dump(updated_yaml_metadata, allow_unicode=True, default_flow_style=False, sort_keys=False)
                         
                         # Use the processed content that was actually sent to Google Keep
@@ -2046,9 +2209,8 @@ def run_push(keep, args, counters):
                         
                         new_file_content = f"---\n{new_yaml_string.strip()}\n---\n{processed_content}"
 
-                        with open(original_filepath, 'w', encoding='utf-8') as f_update_local:
-                            f_update_local.write(new_file_content)
-                        logging.debug(f"    Successfully updated frontmatter in {original_filepath} with ID {created_gnote.id}")
+                        write_markdown_file(original_filepath, new_file_content)
+                        if DEBUG: logging.debug(f"    Successfully updated frontmatter in {original_filepath} with ID {created_gnote.id}")
                     except Exception as e_update_local_id:
                         logging.error(f"    Error updating local file {original_filepath} with new ID {created_gnote.id}: {e_update_local_id}", exc_info=DEBUG)
                         counters['push_errors_local_id_update'] +=1
@@ -2067,12 +2229,17 @@ def run_push(keep, args, counters):
 
 
 # --- Sync Log Note Update Function ---
-def update_sync_log_note(keep, counters, vault_dir, sync_start_time_iso, args, app_config=None):
+def _normalize_log_text(text):
+    """Collapses CRLF and trailing whitespace so platform-only differences don't trigger a remote update."""
+    if not text: return ""
+    return "\n".join(line.rstrip() for line in text.replace("\r\n", "\n").split("\n")).rstrip()
+
+def update_sync_log_note(keep, counters, vault_dir, sync_start_time_dt, args, app_config=None):
     """
     Creates or updates a dedicated sync log note in Keep and locally.
     This note contains a summary of the last sync operation.
     """
-    logging.info("SYNC_LOG_DEBUG: Entered update_sync_log_note function.") # ADDED DEBUG
+    logging.debug("SYNC_LOG_DEBUG: Entered update_sync_log_note function.")
     logging.info(f"Updating sync log note: {SYNC_LOG_TITLE}")
     sync_log_filepath = os.path.join(vault_dir, SYNC_LOG_FILENAME)
     current_op_time_utc = datetime.now(timezone.utc)
@@ -2081,13 +2248,11 @@ def update_sync_log_note(keep, counters, vault_dir, sync_start_time_iso, args, a
     # Prepare summary content
     summary_parts = []
     
-    # Convert sync_start_time_iso (string from main, UTC 'Z') to local for display
-    display_start_time_str = sync_start_time_iso # Fallback to original UTC string
+    # Convert sync_start_time_dt (aware UTC datetime from main) to local for display
+    display_start_time_str = sync_start_time_dt.isoformat().replace('+00:00', 'Z') # Fallback to UTC string
     if LOCAL_TZ:
         try:
-            # Parse the UTC 'Z' string
-            dt_start_utc = datetime.fromisoformat(sync_start_time_iso.replace('Z', '+00:00'))
-            display_start_time_str = dt_start_utc.astimezone(LOCAL_TZ).isoformat(sep=' ', timespec='seconds')
+            display_start_time_str = sync_start_time_dt.astimezone(LOCAL_TZ).isoformat(sep=' ', timespec='seconds')
         except Exception as e_log_time:
             logging.warning(f"SYNC_LOG: Could not convert start time to local for log display: {e_log_time}")
 
@@ -2160,16 +2325,18 @@ def update_sync_log_note(keep, counters, vault_dir, sync_start_time_iso, args, a
 
     gnote_log = None
     existing_log_id = None
+    id_was_valid_match = False # True only when the local ID resolved to an active, correctly-titled note
 
     if os.path.exists(sync_log_filepath):
         local_meta_sync_log = parse_markdown_file(sync_log_filepath, for_push=False)
         if local_meta_sync_log and 'id' in local_meta_sync_log:
             existing_log_id = str(local_meta_sync_log['id'])
             try:
-                candidate_note = keep.get(existing_log_id)
+                candidate_note = _fast_get(keep, existing_log_id)
                 if candidate_note: # Note with ID exists
                     if candidate_note.title == SYNC_LOG_TITLE and not candidate_note.trashed:
                         gnote_log = candidate_note
+                        id_was_valid_match = True
                         logging.debug(f"SYNC_LOG: Found note in Keep by ID {existing_log_id} from local file '{SYNC_LOG_FILENAME}'.")
                     elif candidate_note.trashed:
                          logging.warning(f"SYNC_LOG: Note with ID {existing_log_id} (expected for '{SYNC_LOG_TITLE}') is TRASHED in Keep. Will create a new one.")
@@ -2183,7 +2350,7 @@ def update_sync_log_note(keep, counters, vault_dir, sync_start_time_iso, args, a
             except Exception as e_get_id:
                 logging.warning(f"SYNC_LOG: Error fetching note by presumed ID {existing_log_id}: {e_get_id}", exc_info=DEBUG)
 
-    if not gnote_log:
+    if not id_was_valid_match and not gnote_log: # Full scan only when the ID lookup did not resolve
         logging.debug(f"SYNC_LOG: Searching for note in Keep by title: '{SYNC_LOG_TITLE}'")
         for note in keep.all(): # Iterate through all notes
             if note.title == SYNC_LOG_TITLE and not note.trashed:
@@ -2197,7 +2364,8 @@ def update_sync_log_note(keep, counters, vault_dir, sync_start_time_iso, args, a
     try:
         if gnote_log: # Update existing remote note
             logging.info(f"SYNC_LOG: Updating remote note '{SYNC_LOG_TITLE}' (ID: {gnote_log.id}).")
-            if gnote_log.text != new_content_for_log : gnote_log.text = new_content_for_log
+            if _normalize_log_text(gnote_log.text) != _normalize_log_text(new_content_for_log): # Only mutate on semantic change
+                gnote_log.text = new_content_for_log
             if gnote_log.title != SYNC_LOG_TITLE : gnote_log.title = SYNC_LOG_TITLE
             if gnote_log.archived : gnote_log.archived = False
             if gnote_log.trashed : gnote_log.untrash() # Make sure it's not trashed
@@ -2222,7 +2390,8 @@ def update_sync_log_note(keep, counters, vault_dir, sync_start_time_iso, args, a
         else: # Not a dry run
             logging.debug("SYNC_LOG: Calling keep.sync() to commit log note changes.")
             keep.sync()
-            save_cached_state(keep) # Save state after sync
+            invalidate_remote_id_index()
+            mark_cache_dirty() # State is saved once at the end of main()
             logging.info(f"SYNC_LOG: Remote note '{SYNC_LOG_TITLE}' (ID: {gnote_log.id}) saved. Updated: {gnote_log.timestamps.updated.isoformat()}")
 
         # Prepare YAML and write local file
@@ -2232,23 +2401,22 @@ def update_sync_log_note(keep, counters, vault_dir, sync_start_time_iso, args, a
         if not hasattr(gnote_log.timestamps, 'updated') or not gnote_log.timestamps.updated:
             gnote_log.timestamps.updated = current_op_time_utc # Fallback
 
-        yaml_metadata = {
-            'id': str(gnote_log.id), # Ensure ID is string
-            'title': str(gnote_log.title),
-            'updated': gnote_log.timestamps.updated.isoformat().replace('+00:00', 'Z'),
-            'created': gnote_log.timestamps.created.isoformat().replace('+00:00', 'Z'),
-            'pinned': gnote_log.pinned,
-            'archived': gnote_log.archived, # Should be False
-            'trashed': gnote_log.trashed,   # Should be False
-            'color': gnote_log.color.name,
-            'tags': ['sync_log'] # Add a specific tag
-        }
-        yaml_string = yaml.dump(yaml_metadata, allow_unicode=True, default_flow_style=False, sort_keys=False)
+        # Fixed, all-scalar schema: emit directly instead of going through yaml.dump
+        yaml_string = (
+            f"id: {_yaml_escape(gnote_log.id)}\n"
+            f"title: {_yaml_escape(gnote_log.title)}\n"
+            f"updated: '{gnote_log.timestamps.updated.isoformat().replace('+00:00', 'Z')}'\n"
+            f"created: '{gnote_log.timestamps.created.isoformat().replace('+00:00', 'Z')}'\n"
+            f"pinned: {str(bool(gnote_log.pinned)).lower()}\n"
+            f"archived: {str(bool(gnote_log.archived)).lower()}\n" # Should be false
+            f"trashed: {str(bool(gnote_log.trashed)).lower()}\n"   # Should be false
+            f"color: {_yaml_escape(gnote_log.color.name)}\n"
+            f"tags:\n- sync_log\n" # Add a specific tag
+        )
         # Ensure a blank line after YAML frontmatter for better Markdown rendering
         local_log_markdown = f"---\n{yaml_string.strip()}\n---\n\n{new_content_for_log}"
 
-        with open(sync_log_filepath, 'w', encoding='utf-8') as f:
-            f.write(local_log_markdown)
+        write_markdown_file(sync_log_filepath, local_log_markdown)
         logging.info(f"SYNC_LOG: Local file '{sync_log_filepath}' for sync log (ID: {gnote_log.id}) has been updated.")
 
     except gkeepapi.exception.SyncException as e_sync:
@@ -2261,6 +2429,61 @@ def update_sync_log_note(keep, counters, vault_dir, sync_start_time_iso, args, a
 
 
 # --- Main Execution ---
+def login_with_credentials(keep, email, master_token, app_password):
+    """
+    Authenticates keep with the master token, then falls back to the app password (prompting if unset).
+    Returns (logged_in, master_token, app_password); a credential that was rejected comes back as None.
+    """
+    logged_in = False
+    if master_token:
+        try:
+            logging.info("Attempting authentication using Master Token...")
+            keep.authenticate(email, master_token, sync=False) # Sync=False initially
+            logged_in = True
+            logging.info("Authentication successful using Master Token.")
+        except gkeepapi.exception.LoginException as e:
+            logging.warning(f"Master Token authentication failed: {e}", exc_info=DEBUG)
+            master_token = None
+        except Exception as e_auth:
+            logging.error(f"Unexpected error during master token auth: {e_auth}", exc_info=DEBUG)
+            master_token = None
+
+
+    if not logged_in:
+        if not app_password:
+            try: app_password = getpass.getpass(f"Enter App Password for {email} (or leave blank): ")
+            except EOFError: app_password = None
+        if app_password:
+            try:
+                logging.info("Attempting login using App Password...")
+                keep.login(email, app_password, sync=False) # Sync=False initially
+                logged_in = True
+                logging.info("Login successful using App Password.")
+            except gkeepapi.exception.LoginException as e:
+                logging.warning(f"App Password login failed: {e}", exc_info=DEBUG)
+                app_password = None
+            except Exception as e_login:
+                logging.error(f"Unexpected error during app password login: {e_login}", exc_info=DEBUG)
+                app_password = None
+    return logged_in, master_token, app_password
+
+def initial_keep_sync(keep, state):
+    """Resumes from the cached state with a delta sync, or runs a full sync. Returns False if Keep discarded the state."""
+    if state:
+        logging.info("Resuming session with cached state (delta sync)...")
+        # Already authenticated: restore the cached nodes and only fetch changes since their version
+        keep.restore(state)
+        try:
+            keep.sync()
+        except gkeepapi.exception.ResyncRequiredException:
+            logging.warning("Keep requested a full resync. Discarding cached state and checkpoint.")
+            keep.sync(resync=True)
+            return False
+    else:
+        logging.info("Performing full sync as no cache state or --full-sync specified...")
+        keep.sync()
+    return True
+
 def main():
     reconfigure_stdio() # Ensure UTF-8 early
     sync_start_time = datetime.now(timezone.utc) # Record sync start time
@@ -2268,7 +2491,9 @@ def main():
     parser = argparse.ArgumentParser(description="Two-way sync between local Markdown vault and Google Keep.")
     parser.add_argument("email", nargs='?', default=None, help="Google account email (optional, reads from .env).")
     parser.add_argument("--full-sync", action="store_true", help="Ignore cached state for a full Keep sync.")
+    parser.add_argument("--since", default=None, help="ISO timestamp: PULL skips notes not updated in Keep since then (overrides the saved checkpoint).")
     parser.add_argument("--debug", action="store_true", help="Enable detailed debug logging (gkeepapi and script).")
+    parser.add_argument("--auth-ttl-hours", type=float, default=DEFAULT_AUTH_TTL_HOURS, help=f"Reuse the cached Google auth session for this many hours (default: {DEFAULT_AUTH_TTL_HOURS}, 0 disables).")
     parser.add_argument("--dry-run", action="store_true", help="Simulate pull and push, make no actual changes.")
     
     # Pull specific args
@@ -2321,37 +2546,26 @@ def main():
     logged_in = False
 
     if not logged_in and not master_token: master_token = get_master_token(email)
-    if master_token:
+
+    # Reuse a cached OAuth session to skip the token exchange round-trip; gkeepapi refreshes it on 401
+    token_cache = load_token_cache(email) if master_token and args.auth_ttl_hours > 0 else None
+    if token_cache:
         try:
-            logging.info("Attempting authentication using Master Token...")
-            keep.authenticate(email, master_token, sync=False) # Sync=False initially
+            auth = gkeepapi.APIAuth(keep.OAUTH_SCOPES)
+            auth.setEmail(email)
+            auth.setMasterToken(master_token)
+            auth.setDeviceId(token_cache['device_id'])
+            auth._auth_token = token_cache['auth_token'] # No public setter
+            keep.load(auth, sync=False)
             logged_in = True
-            logging.info("Authentication successful using Master Token.")
-        except gkeepapi.exception.LoginException as e:
-            logging.warning(f"Master Token authentication failed: {e}", exc_info=DEBUG)
-            master_token = None
-        except Exception as e_auth:
-            logging.error(f"Unexpected error during master token auth: {e_auth}", exc_info=DEBUG)
-            master_token = None
-
+            logging.info("Authentication restored from cached session.")
+        except Exception as e_cached_auth:
+            logging.warning(f"Could not restore cached session: {e_cached_auth}", exc_info=DEBUG)
+            invalidate_token_cache(email)
+            token_cache = None
 
     if not logged_in:
-        if not app_password:
-            try: app_password = getpass.getpass(f"Enter App Password for {email} (or leave blank): ")
-            except EOFError: app_password = None
-        if app_password:
-            try:
-                logging.info("Attempting login using App Password...")
-                keep.login(email, app_password, sync=False) # Sync=False initially
-                logged_in = True
-                logging.info("Login successful using App Password.")
-            except gkeepapi.exception.LoginException as e:
-                logging.warning(f"App Password login failed: {e}", exc_info=DEBUG)
-                app_password = None
-            except Exception as e_login:
-                logging.error(f"Unexpected error during app password login: {e_login}", exc_info=DEBUG)
-                app_password = None
-
+        logged_in, master_token, app_password = login_with_credentials(keep, email, master_token, app_password)
 
     if not logged_in:
         logging.error("Authentication failed. Cannot proceed.")
@@ -2361,6 +2575,17 @@ def main():
     logging.info("Performing initial sync with Google Keep service...")
     state = None
     if not args.full_sync: state = load_cached_state()
+    sync_checkpoint = load_sync_checkpoint(state)
+    if args.since:
+        try:
+            sync_checkpoint = datetime.fromisoformat(args.since.replace('Z', '+00:00'))
+            if sync_checkpoint.tzinfo is None:
+                sync_checkpoint = sync_checkpoint.replace(tzinfo=LOCAL_TZ or timezone.utc)
+            sync_checkpoint = sync_checkpoint.astimezone(timezone.utc)
+            logging.info(f"Using sync checkpoint from --since: {sync_checkpoint.isoformat()}")
+        except ValueError as e_since:
+            logging.error(f"Invalid --since value '{args.since}': {e_since}")
+            sys.exit(1)
     
     try:
         # Determine the credential that worked, or default to master_token if both present
@@ -2369,14 +2594,32 @@ def main():
             logging.error("No valid authentication credential available for sync/resume. This is unexpected.")
             sys.exit(1)
 
-        if state:
-            logging.info("Resuming session with cached state...")
-            keep.authenticate(email, auth_credential_for_resume, state=state, sync=True) # CORRECTED
-        else:
-            logging.info("Performing full sync as no cache state or --full-sync specified...")
-            keep.sync()
+        try:
+            state_kept = initial_keep_sync(keep, state)
+        except gkeepapi.exception.LoginException as e_cached_session:
+            if not token_cache:
+                raise
+            # The cached session was never checked against the server; its token refresh failing
+            # (e.g. a revoked master token) falls back to the regular master token / app password chain
+            logging.warning(f"Cached auth session was rejected: {e_cached_session}. Re-authenticating.", exc_info=DEBUG)
+            invalidate_token_cache(email)
+            token_cache = None
+            keep = gkeepapi.Keep()
+            logged_in, master_token, app_password = login_with_credentials(keep, email, master_token, app_password)
+            if not logged_in:
+                logging.error("Authentication failed. Cannot proceed.")
+                sys.exit(1)
+            state_kept = initial_keep_sync(keep, state)
+        if not state_kept:
+            state = None
+            sync_checkpoint = None
         logging.info("Initial sync with Google Keep service complete.")
-        save_cached_state(keep)
+        mark_cache_dirty()
+    except gkeepapi.exception.LoginException as e_login_sync:
+        logging.error(f"Authentication rejected during initial sync: {e_login_sync}", exc_info=DEBUG)
+        invalidate_token_cache(email)
+        logging.error("Cached auth session cleared. Re-run to authenticate again.")
+        sys.exit(1)
     except gkeepapi.exception.SyncException as e:
         logging.error(f"Error during initial Google Keep sync: {e}", exc_info=DEBUG)
         if not state: logging.error("Full sync failed.")
@@ -2386,6 +2629,14 @@ def main():
         logging.error(f"Unexpected error during initial sync/resume: {e_initial_sync}", exc_info=DEBUG)
         sys.exit(1)
 
+    # Cache the (possibly refreshed) auth session now that it has been proven to work
+    if master_token and args.auth_ttl_hours > 0:
+        session_auth = keep._keep_api.getAuth()
+        if session_auth and session_auth.getAuthToken():
+            expires_at = datetime.fromisoformat(token_cache['expires_at']) if token_cache \
+                else datetime.now(timezone.utc) + timedelta(hours=args.auth_ttl_hours)
+            save_token_cache(email, session_auth.getAuthToken(), session_auth.getDeviceId(), expires_at)
+
     # Initialize counters for summary
     counters = {
         'pull_created_local': 0, 'pull_updated_local': 0, 'pull_skipped_no_change':0,
@@ -2396,6 +2647,7 @@ def main():
         'push_created_remote': 0, 'push_updated_remote': 0,
         'push_skipped_no_change': 0, 'push_skipped_conflict_remote_newer': 0,
         'push_skipped_deleted_remotely': 0, 'push_skipped_potential_duplicate_new_note': 0,
+        'push_skipped_no_material_change': 0,
         'push_skipped_no_clear_local_precedence':0,
         'push_cherrypick_dry_run_prompts': 0, 'push_cherrypick_local_chosen': 0,
         'push_cherrypick_remote_chosen_local_updated': 0, 'push_cherrypick_user_skipped': 0,
@@ -2512,9 +2764,10 @@ def main():
     # --- End Backup Logic ---
 
     # --- Run PULL Operation ---
+    newest_remote_update = None
     if not args.skip_pull:
         if args.dry_run: print("\n--- [Dry Run] Simulating PULL operation ---")
-        run_pull(keep, args, counters)
+        newest_remote_update = run_pull(keep, args, counters, sync_checkpoint)
         if args.dry_run: print("--- [Dry Run] PULL simulation finished ---")
         
         # After pull, if not skipping push, a resync might be beneficial if pull made many changes
@@ -2535,41 +2788,61 @@ def main():
         logging.info("Skipping PUSH operation as requested.")
 
     # --- Summary ---
-    print("\n--- Sync Summary ---")
+    # Human-readable summary, written to stdout in one call
+    lines = ["\n--- Sync Summary ---\n"]
     if not args.skip_pull:
-        print("PULL Operation:")
-        print(f"  Local files created: {counters['pull_created_local']}")
-        print(f"  Local files updated: {counters['pull_updated_local']}")
-        print(f"  Local content updates skipped (remote not newer): {counters['pull_skipped_no_change']}")
-        print(f"  Local files moved/renamed: {counters['pull_moved_local']}")
-        print(f"  Orphaned local notes deleted: {counters['pull_deleted_local_orphan']}")
-        print(f"  Orphaned local attachments deleted: {counters['pull_deleted_orphaned_attachments']}")
-
-        print(f"  Empty remote notes skipped: {counters['pull_skipped_empty']}")
-        if counters['pull_errors'] > 0: print(f"  Errors during pull: {counters['pull_errors']}")
+        lines.append("PULL Operation:\n")
+        lines.append(f"  Local files created: {counters['pull_created_local']}\n")
+        lines.append(f"  Local files updated: {counters['pull_updated_local']}\n")
+        lines.append(f"  Local content updates skipped (remote not newer): {counters['pull_skipped_no_change']}\n")
+        lines.append(f"  Local files moved/renamed: {counters['pull_moved_local']}\n")
+        lines.append(f"  Orphaned local notes deleted: {counters['pull_deleted_local_orphan']}\n")
+        lines.append(f"  Orphaned local attachments deleted: {counters['pull_deleted_orphaned_attachments']}\n")
+        lines.append(f"  Empty remote notes skipped: {counters['pull_skipped_empty']}\n")
+        if counters['pull_errors'] > 0: lines.append(f"  Errors during pull: {counters['pull_errors']}\n")
     
     if not args.skip_push:
-        print("PUSH Operation:")
-        print(f"  Remote notes created in Keep: {counters['push_created_remote']}")
-        print(f"  Remote notes updated in Keep: {counters['push_updated_remote']}")
-        print(f"  Remote updates skipped (no changes): {counters['push_skipped_no_change']}")
+        lines.append("PUSH Operation:\n")
+        lines.append(f"  Remote notes created in Keep: {counters['push_created_remote']}\n")
+        lines.append(f"  Remote notes updated in Keep: {counters['push_updated_remote']}\n")
+        lines.append(f"  Remote updates skipped (no changes): {counters['push_skipped_no_change']}\n")
         if counters['push_skipped_conflict_remote_newer'] > 0:
-            print(f"Skipped pushing {counters['push_skipped_conflict_remote_newer']} notes where remote was newer (no --force).")
+            lines.append(f"Skipped pushing {counters['push_skipped_conflict_remote_newer']} notes where remote was newer (no --force).\n")
 
     if args.dry_run:
-        print("\n[Dry Run Mode] No actual changes were made to local files or Google Keep.")
+        lines.append("\n[Dry Run Mode] No actual changes were made to local files or Google Keep.\n")
+    sys.stdout.write("".join(lines))
+    sys.stdout.flush()
+
+    # One structured record per run for log parsing (cron/systemd)
+    summary_record = {
+        'dry_run': bool(args.dry_run),
+        'pull': not args.skip_pull,
+        'push': not args.skip_push,
+        'counters': counters,
+    }
+    logging.info(f"sync.summary {json.dumps(summary_record, sort_keys=True)}")
     
     # Obsidian config sync feature removed in latest version
 
     # Update the dedicated sync log note (after pull/push, before final console summary)
     if not args.dry_run: # Don't update log note file/remote on dry run, but summary construction can be tested by function if needed
         # The update_sync_log_note function has its own dry_run checks for remote operations
-        logging.info("MAIN_DEBUG: About to call update_sync_log_note.")
-        update_sync_log_note(keep, counters, VAULT_DIR, sync_start_time.isoformat().replace('+00:00', 'Z'), args, app_config)
-        logging.info("MAIN_DEBUG: Returned from update_sync_log_note.")
+        logging.debug("MAIN_DEBUG: About to call update_sync_log_note.")
+        update_sync_log_note(keep, counters, VAULT_DIR, sync_start_time, args, app_config)
+        logging.debug("MAIN_DEBUG: Returned from update_sync_log_note.")
     elif args.dry_run:
         print(f"\n[Dry Run] Sync log note ('{SYNC_LOG_FILENAME}') would be updated with the summary above.")
-        logging.info(f"MAIN_DEBUG: Dry run - would have updated sync log note.")
+        logging.debug("MAIN_DEBUG: Dry run - would have updated sync log note.")
+
+    if _cache_dirty:
+        # Advance the checkpoint only after a clean, real pull; otherwise keep the previous one
+        checkpoint_iso = sync_checkpoint.isoformat().replace('+00:00', 'Z') if sync_checkpoint else None
+        # The new checkpoint is the newest remote 'updated' minus a margin: Keep's timestamps come from the
+        # editing device's clock, so this machine's clock could skip edits from a device running behind
+        if not args.skip_pull and not args.dry_run and counters['pull_errors'] == 0 and newest_remote_update:
+            checkpoint_iso = (newest_remote_update - SYNC_CHECKPOINT_MARGIN).isoformat().replace('+00:00', 'Z')
+        save_cached_state(keep, checkpoint_iso)
 
     logging.info("--- sync.py execution finished ---")
 
@@ -1,11 +1,34 @@
 import os
+import re
 import sys
 import uuid
+import tempfile
+import json
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 import yaml
 
+# Prefer the libyaml-backed loader/dumper when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
+FRONTMATTER_PATTERN = re.compile(r'\A---\n(.*?)^---\n', re.S | re.M)
+# Sidecar of per-vault file mtimes from the last run; unchanged files are skipped
+MTIME_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'lawa-tu', 'frontmatter_mtimes.json')
+HEAD_READ_SIZE = 16384  # Frontmatter normally fits in the first chunk of a note
+TIMESTAMP_KEYS = ('created', 'updated', 'edited')
+# Below this many files, starting worker processes costs more than it saves
+PARALLEL_SCAN_MIN_FILES = 64
+_now_iso = None  # Fallback timestamp for files that cannot be stat'ed, computed once per run
+
+KEEP_STYLE_KEY_ORDER = [
+    'id', 'title', 'color', 'pinned', 'created', 'updated', 'edited', 'archived', 'trashed', 'tags'
+]
+
 
 def read_file_text(path: str) -> str:
     with open(path, 'r', encoding='utf-8') as f:
@@ -13,18 +36,30 @@ def read_file_text(path: str) -> str:
 
 
 def write_file_text(path: str, content: str) -> None:
-    with open(path, 'w', encoding='utf-8') as f:
-        f.write(content)
+    # Write to a temp file next to the target, then atomically swap it in
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.write(content)
+        try:
+            # mkstemp creates the file as 0600; keep the original permissions
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
 
 
 def split_frontmatter_and_body(text: str):
-    if text.startswith('---\n'):
-        # Find the closing '---' line
-        end_idx = text.find('\n---\n', 4)
-        if end_idx != -1:
-            yaml_str = text[4:end_idx]
-            body = text[end_idx + 5 :]
-            return yaml_str, body
+    # Single anchored match for the leading '---' block up to the closing '---' line
+    match = FRONTMATTER_PATTERN.match(text)
+    if match:
+        return match.group(1), text[match.end():]
     return None, text
 
 
@@ -58,21 +93,25 @@ def ensure_keep_style_frontmatter(meta: dict, file_path: str) -> dict:
         # KeepVault examples include timezone offset; we stick to ISO without offset for simplicity
         return datetime.fromtimestamp(ts).isoformat()
 
-    try:
-        stat = os.stat(file_path)
-        fallback_created = iso_from_ts(stat.st_ctime)
-        fallback_updated = iso_from_ts(stat.st_mtime)
-    except Exception:
-        now = datetime.now().isoformat()
-        fallback_created = now
-        fallback_updated = now
-
-    if 'created' not in meta or not meta['created']:
-        meta['created'] = fallback_created
-    if 'updated' not in meta or not meta['updated']:
-        meta['updated'] = fallback_updated
-    if 'edited' not in meta or not meta['edited']:
-        meta['edited'] = meta.get('updated', fallback_updated)
+    # Only stat the file when a timestamp actually needs a fallback
+    if not all(meta.get(key) for key in TIMESTAMP_KEYS):
+        global _now_iso
+        try:
+            stat = os.stat(file_path)
+            fallback_created = iso_from_ts(stat.st_ctime)
+            fallback_updated = iso_from_ts(stat.st_mtime)
+        except Exception:
+            if _now_iso is None:
+                _now_iso = datetime.now().isoformat()
+            fallback_created = _now_iso
+            fallback_updated = _now_iso
+
+        if 'created' not in meta or not meta['created']:
+            meta['created'] = fallback_created
+        if 'updated' not in meta or not meta['updated']:
+            meta['updated'] = fallback_updated
+        if 'edited' not in meta or not meta['edited']:
+            meta['edited'] = meta.get('updated', fallback_updated)
 
     # tags: prefer tags over labels; migrate labels -> tags and ensure NotionImport present
     existing_tags = meta.get('tags')
@@ -107,41 +146,113 @@ def ensure_keep_style_frontmatter(meta: dict, file_path: str) -> dict:
     return meta
 
 
+class OrderedPairs(list):
+    # (key, value) pairs emitted as a YAML mapping in list order
+    pass
+
+
+class KeepStyleDumper(_YamlDumper):
+    pass
+
+
+KeepStyleDumper.add_representer(
+    OrderedPairs, lambda dumper, pairs: dumper.represent_mapping('tag:yaml.org,2002:map', pairs)
+)
+
+
 def dump_yaml(meta: dict) -> str:
-    # Preserve key order similar to KeepVault appearance
-    ordered_keys = [
-        'id', 'title', 'color', 'pinned', 'created', 'updated', 'edited', 'archived', 'trashed', 'tags'
-    ]
-    ordered = {}
-    for key in ordered_keys:
-        if key in meta:
-            ordered[key] = meta[key]
-    # Include any extra keys at the end
-    for key in meta:
-        if key not in ordered:
-            ordered[key] = meta[key]
-    return yaml.safe_dump(ordered, sort_keys=False, allow_unicode=True).strip()
-
-
-def process_file(path: str) -> bool:
-    original = read_file_text(path)
-    yaml_str, body = split_frontmatter_and_body(original)
+    # Preserve key order similar to KeepVault appearance, with any extra keys at the end
+    pairs = OrderedPairs((key, meta[key]) for key in KEEP_STYLE_KEY_ORDER if key in meta)
+    pairs.extend((key, value) for key, value in meta.items() if key not in KEEP_STYLE_KEY_ORDER)
+    return yaml.dump(pairs, Dumper=KeepStyleDumper, sort_keys=False, allow_unicode=True).strip()
+
+
+def load_keep_style_frontmatter(text: str, path: str):
+    # Returns (yaml_str, body, loaded meta, Keep-style meta)
+    yaml_str, body = split_frontmatter_and_body(text)
     meta = {}
     if yaml_str is not None:
         try:
-            loaded = yaml.safe_load(yaml_str)
+            loaded = yaml.load(yaml_str, Loader=_YamlLoader)
             if isinstance(loaded, dict):
                 meta = loaded
         except Exception:
             # Treat as no frontmatter on parse error
             meta = {}
-    meta = ensure_keep_style_frontmatter(meta, path)
+    return yaml_str, body, meta, ensure_keep_style_frontmatter(meta, path)
+
+
+def process_file(path: str, write: bool = True) -> bool:
+    # Returns True if the file needs (write=False) or got (write=True) new frontmatter
+    with open(path, 'r', encoding='utf-8') as f:
+        # Look at the head first; the body is only read when the file may need rewriting
+        original = f.read(HEAD_READ_SIZE)
+        yaml_str, body, loaded_meta, meta = load_keep_style_frontmatter(original, path)
+        if yaml_str is not None and is_already_keep_style(loaded_meta, meta):
+            return False
+        rest = f.read()
+    if rest:
+        original += rest
+        if yaml_str is None:
+            # The frontmatter block may continue past the head
+            yaml_str, body, loaded_meta, meta = load_keep_style_frontmatter(original, path)
+            if yaml_str is not None and is_already_keep_style(loaded_meta, meta):
+                return False
+        else:
+            body += rest
     new_yaml = dump_yaml(meta)
     new_content = f"---\n{new_yaml}\n---\n{body}"
-    if new_content != original:
+    if new_content == original:
+        return False
+    if write:
         write_file_text(path, new_content)
-        return True
-    return False
+    return True
+
+
+def is_already_keep_style(loaded: dict, meta: dict) -> bool:
+    # ensure_keep_style_frontmatter added/changed nothing and keys are already in Keep order,
+    # so re-dumping would only reproduce the existing frontmatter
+    if loaded != meta:
+        return False
+    keys = list(loaded)
+    expected = [k for k in KEEP_STYLE_KEY_ORDER if k in loaded]
+    return keys[:len(expected)] == expected
+
+
+def load_mtime_cache(vault_path: str) -> dict:
+    try:
+        with open(MTIME_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        entries = cache.get(vault_path)
+        return entries if isinstance(entries, dict) else {}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def save_mtime_cache(vault_path: str, entries: dict) -> None:
+    try:
+        with open(MTIME_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if not isinstance(cache, dict):
+            cache = {}
+    except (OSError, ValueError):
+        cache = {}
+    cache[vault_path] = entries
+    try:
+        os.makedirs(os.path.dirname(MTIME_CACHE_FILE), exist_ok=True)
+        with open(MTIME_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print(f"Could not save mtime cache {MTIME_CACHE_FILE}: {e}")
+
+
+def process_file_worker(path: str):
+    # Runs in a worker process; returns (changed, mtime_ns after processing, error message)
+    try:
+        changed = process_file(path)
+        return changed, os.stat(path).st_mtime_ns, None
+    except Exception as e:
+        return False, None, str(e)
 
 
 def iter_markdown_files(root: str):
@@ -155,6 +266,7 @@ def main():
     parser = argparse.ArgumentParser(description='Add/ensure frontmatter for NotionVault notes with NotionImport label')
     parser.add_argument('--vault', default=os.path.join(os.getcwd(), 'NotionVault'), help='Path to NotionVault root')
     parser.add_argument('--dry-run', action='store_true', help='Do not write changes, only report')
+    parser.add_argument('--no-cache', action='store_true', help='Process every file, ignoring mtimes recorded by the last run')
     args = parser.parse_args()
 
     vault_path = os.path.abspath(args.vault)
@@ -164,36 +276,53 @@ def main():
 
     changed = 0
     total = 0
+    skipped = 0
+    use_cache = not args.dry_run and not args.no_cache
+    mtime_cache = load_mtime_cache(vault_path) if use_cache else {}
+    new_mtime_cache = {}
+    pending = []
     for md_path in iter_markdown_files(vault_path):
         total += 1
-        if args.dry_run:
+        if use_cache:
+            rel_path = os.path.relpath(md_path, vault_path)
             try:
-                original = read_file_text(md_path)
-            except Exception:
+                mtime_ns = os.stat(md_path).st_mtime_ns
+            except OSError:
                 continue
-            yaml_str, _body = split_frontmatter_and_body(original)
-            meta = {}
-            if yaml_str is not None:
-                try:
-                    loaded = yaml.safe_load(yaml_str)
-                    if isinstance(loaded, dict):
-                        meta = loaded
-                except Exception:
-                    meta = {}
-            meta = ensure_keep_style_frontmatter(meta, md_path)
-            # simulate content
-            new_yaml = dump_yaml(meta)
-            new_content = f"---\n{new_yaml}\n---\n"
-            if not original.startswith(new_content):
-                changed += 1
-        else:
+            if mtime_cache.get(rel_path) == mtime_ns:
+                new_mtime_cache[rel_path] = mtime_ns
+                skipped += 1
+                continue
+        pending.append(md_path)
+
+    if args.dry_run:
+        # Serial: dry-run only reads files, and keeps any output in order
+        for md_path in pending:
             try:
-                if process_file(md_path):
+                if process_file(md_path, write=False):
                     changed += 1
             except Exception as e:
                 print(f"Error processing {md_path}: {e}")
+    else:
+        # YAML parse/dump is CPU bound and files are independent, so large batches are spread over processes
+        if len(pending) >= PARALLEL_SCAN_MIN_FILES:
+            with ProcessPoolExecutor() as executor:
+                results = list(executor.map(process_file_worker, pending, chunksize=64))
+        else:
+            results = [process_file_worker(md_path) for md_path in pending]
+        for md_path, (file_changed, mtime_ns, error) in zip(pending, results):
+            if error is not None:
+                print(f"Error processing {md_path}: {error}")
+                continue
+            if file_changed:
+                changed += 1
+            if use_cache:
+                new_mtime_cache[os.path.relpath(md_path, vault_path)] = mtime_ns
+
+    if use_cache:
+        save_mtime_cache(vault_path, new_mtime_cache)
 
-    print(f"Processed {total} markdown files in {vault_path}. Updated {changed}.")
+    print(f"Processed {total} markdown files in {vault_path}. Updated {changed}. Skipped {skipped} unchanged since last run.")
     return 0
 
 
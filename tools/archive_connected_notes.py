@@ -1,82 +1,201 @@
 #!/usr/bin/env python3
 
 import os
+import sys
+import logging
+import logging.handlers
+import argparse
+import pickle
+from bisect import bisect_right
 import re
 import yaml
-import glob
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Prefer the libyaml-backed loader/dumper when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
 
 # Configuration
 VAULT_DIR = "KeepVault"
 LINK_PATTERN = re.compile(r'\[\[(.*?)(?:\|.*?)?\]\]')  # Match Obsidian links [[Note]] or [[Note|Alias]]
+FRONTMATTER_PATTERN = re.compile(r'\A---\n(.*?)^---\n', re.S | re.M)  # Leading '---' block, closed by a '---' line
+ARCHIVED_LINE_PATTERN = re.compile(r'^archived:[ \t]*\S+[ \t]*$', re.M)  # A plain scalar 'archived: ...' line
+LINK_CACHE_FILE = ".lawa-tu-linkcache"  # Parsed frontmatter + links per file, reused while (mtime, size) match
+LINK_CACHE_VERSION = 1
+HEAD_READ_SIZE = 16384  # Frontmatter normally fits in the first chunk of a note
+MAX_READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # File reads are I/O bound and release the GIL
 
 def parse_frontmatter(content):
     """Parse YAML frontmatter from markdown content"""
-    if not content.startswith('---\n'):
-        return {}, content
-    
-    parts = content.split('---\n', 2)
-    if len(parts) < 3:
+    match = FRONTMATTER_PATTERN.match(content)
+    if not match:
         return {}, content
     
     try:
-        frontmatter = yaml.safe_load(parts[1])
-        note_content = parts[2]
+        frontmatter = yaml.load(match.group(1), Loader=_YamlLoader)
+        note_content = content[match.end():]
         return frontmatter or {}, note_content
     except yaml.YAMLError:
         return {}, content
 
+def load_link_cache():
+    """Load the on-disk link cache. Returns {} if it is missing, unreadable or from another version."""
+    try:
+        with open(LINK_CACHE_FILE, 'rb') as file:
+            cache = pickle.load(file)
+        if cache.get('version') == LINK_CACHE_VERSION:
+            return cache['entries']
+    except Exception:
+        pass
+    return {}
+
+def save_link_cache(entries):
+    """Atomically write the link cache."""
+    try:
+        tmp_path = LINK_CACHE_FILE + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            pickle.dump({'version': LINK_CACHE_VERSION, 'entries': entries}, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, LINK_CACHE_FILE)
+    except Exception as e:
+        print(f"Warning: could not save link cache {LINK_CACHE_FILE}: {e}")
+
+def _scan_file(file_path, link_cache=None):
+    """Read and parse one note, or reuse its link cache entry if the file is unchanged.
+    Returns (note_name, note_data, title) or None on error. Cached notes have no
+    'content'/'note_content' (None)."""
+    try:
+        stat = os.stat(file_path)
+        file_key = (stat.st_mtime_ns, stat.st_size)
+        
+        # Extract filename without extension
+        filename = os.path.basename(file_path)
+        note_name = sys.intern(os.path.splitext(filename)[0])  # Names recur as dict keys and link targets
+        
+        cached = link_cache.get(os.path.abspath(file_path)) if link_cache else None
+        if cached is not None and cached[0] == file_key:
+            content = note_content = None
+            frontmatter, outgoing_links = cached[1], [sys.intern(link) for link in cached[2]]
+        else:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                content = file.read()
+            
+            # Parse frontmatter
+            frontmatter, note_content = parse_frontmatter(content)
+            outgoing_links = []  # Filled by the joined scan in load_notes
+        title = sys.intern(frontmatter.get('title', '').strip())
+        
+        note_data = {
+            'path': file_path,
+            'file_key': file_key,
+            'content': content,
+            'frontmatter': frontmatter,
+            'note_content': note_content,
+            'outgoing_links': outgoing_links,
+            'has_connections': False,
+            'is_archived': 'Archived' in file_path,
+            'is_trashed': 'Trashed' in file_path
+        }
+        return note_name, note_data, title
+    
+    except Exception as e:
+        print(f"Error processing {file_path}: {e}")
+        return None
+
+def iter_markdown_files(root):
+    """Yield .md paths under root lazily, skipping hidden entries like glob's '**' does."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for name in filenames:
+            if name.endswith('.md') and not name.startswith('.'):
+                yield os.path.join(dirpath, name)
+
+log = logging.getLogger("archive_connected_notes")
+
+def setup_logging(verbose=False):
+    """Per-link details are logged at DEBUG (shown with --verbose) through a buffered handler."""
+    target = logging.StreamHandler(sys.stdout)
+    target.setFormatter(logging.Formatter('%(message)s'))
+    handler = logging.handlers.MemoryHandler(capacity=1000, flushLevel=logging.WARNING, target=target)
+    log.addHandler(handler)
+    log.setLevel(logging.DEBUG if verbose else logging.INFO)
+    log.propagate = False
+
+def flush_log():
+    """Write out buffered log records so they stay in order with print output."""
+    for handler in log.handlers:
+        handler.flush()
+
+def build_link_index(filename_to_note, title_to_filename):
+    """Build the exact and case-insensitive link lookups, each mapping to (match kind, filename, note).
+    
+    Exact keys: filename, then title. Lower-cased keys: filename, then title (first entry wins
+    on collisions). They are kept apart so an exact key never shadows a lower-cased one.
+    """
+    exact_index = {}
+    for filename, note_data in filename_to_note.items():
+        exact_index[filename] = ("Direct", filename, note_data)
+    for title, filename in title_to_filename.items():
+        exact_index.setdefault(title, ("Title", filename, filename_to_note[filename]))
+    lower_index = {}
+    for filename, note_data in filename_to_note.items():
+        lower_index.setdefault(sys.intern(filename.lower()), ("Case-insensitive", filename, note_data))
+    for title, filename in title_to_filename.items():
+        lower_index.setdefault(sys.intern(title.lower()), ("Title case-insensitive", filename, filename_to_note[filename]))
+    return exact_index, lower_index
+
 def load_notes():
     """Load all notes and extract their links"""
     notes = {}
     title_to_filename = {}  # Map titles to filenames for link resolution
     filename_to_note = {}   # Map filenames to note data
     
-    # Scan all markdown files, including those in subfolders
-    markdown_files = glob.glob(f"{VAULT_DIR}/**/*.md", recursive=True)
-    
+    # First pass: Walk the vault once and read files in parallel, then build lookup tables
+    # on this thread (map keeps file order).
     # NO LONGER SKIP archived and trashed notes - we want to process ALL files to find connections
-    print(f"Found {len(markdown_files)} total markdown files to scan...")
+    link_cache = load_link_cache()
+    with ThreadPoolExecutor(max_workers=MAX_READ_WORKERS) as executor:
+        scanned = list(executor.map(lambda path: _scan_file(path, link_cache), iter_markdown_files(VAULT_DIR)))
     
-    # First pass: Load all notes and build lookup tables
-    for file_path in markdown_files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-                
-            # Extract filename without extension
-            filename = os.path.basename(file_path)
-            note_name = os.path.splitext(filename)[0]
-            
-            # Parse frontmatter
-            frontmatter, note_content = parse_frontmatter(content)
-            title = frontmatter.get('title', '').strip()
-            
-            # Store the note
-            note_data = {
-                'path': file_path,
-                'content': content,
-                'frontmatter': frontmatter,
-                'note_content': note_content,
-                'outgoing_links': [],
-                'has_connections': False,
-                'is_archived': 'Archived' in file_path,
-                'is_trashed': 'Trashed' in file_path
-            }
-            
-            notes[note_name] = note_data
-            filename_to_note[note_name] = note_data
-            
-            # Build title mapping (if title exists and is different from filename)
-            if title and title != note_name:
-                title_to_filename[title] = note_name
-                # Also try title with spaces replaced by underscores (common in Keep)
-                title_normalized = title.replace(' ', '_')
-                if title_normalized != note_name:
-                    title_to_filename[title_normalized] = note_name
+    print(f"Scanned {len(scanned)} total markdown files...")
+    
+    for result in scanned:
+        if result is None:
+            continue
+        note_name, note_data, title = result
         
-        except Exception as e:
-            print(f"Error processing {file_path}: {e}")
+        notes[note_name] = note_data
+        filename_to_note[note_name] = note_data
+        
+        # Build title mapping (if title exists and is different from filename)
+        if title and title != note_name:
+            title_to_filename[title] = note_name
+            # Also try title with spaces replaced by underscores (common in Keep)
+            title_normalized = sys.intern(title.replace(' ', '_'))
+            if title_normalized != note_name:
+                title_to_filename[title_normalized] = note_name
+    
+    # Extract links for all re-read notes with one regex scan over the joined bodies. LINK_PATTERN
+    # cannot match across '\n', so joining on '\n' keeps every match inside a single note.
+    note_list = [result[1] for result in scanned if result is not None and result[1]['note_content'] is not None]
+    offsets = []
+    position = 0
+    for note_data in note_list:
+        offsets.append(position)
+        position += len(note_data['note_content']) + 1
+    joined_content = '\n'.join(note_data['note_content'] for note_data in note_list)
+    for match in LINK_PATTERN.finditer(joined_content):
+        owner = note_list[bisect_right(offsets, match.start()) - 1]
+        owner['outgoing_links'].append(sys.intern(match.group(1)))
+    
+    # Refresh the link cache with every file seen this run (drops deleted files)
+    save_link_cache({
+        os.path.abspath(note_data['path']): (note_data['file_key'], note_data['frontmatter'], note_data['outgoing_links'])
+        for _name, note_data, _title in filter(None, scanned)
+    })
+    
+    exact_index, lower_index = build_link_index(filename_to_note, title_to_filename)
     
     print(f"Loaded {len(notes)} notes")
     print(f"Built {len(title_to_filename)} title mappings")
@@ -86,56 +205,30 @@ def load_notes():
     files_with_links = 0
     
     # Second pass: Find all links and establish connections
+    verbose = log.isEnabledFor(logging.DEBUG)  # Checked once; skips building messages nobody sees
     for note_name, note_data in notes.items():
-        # Find all links in the content
-        links = LINK_PATTERN.findall(note_data['note_content'])
+        # Links were extracted by the joined scan above
+        links = note_data['outgoing_links']
         if links:
             files_with_links += 1
             total_links += len(links)
-            print(f"Found {len(links)} outgoing links in '{note_name}': {links}")
-            note_data['outgoing_links'] = links
+            if verbose:
+                log.debug(f"Found {len(links)} outgoing links in '{note_name}': {links}")
             note_data['has_connections'] = True  # This note has outgoing links
             
-            # Register incoming links for the targets
+            # Register incoming links for the targets: exact key first, then the lower-cased key
             for link in links:
-                # Try to resolve the link to an actual note
-                target_note = None
-                
-                # Direct filename match (most common)
-                if link in filename_to_note:
-                    target_note = filename_to_note[link]
-                    print(f"  Direct match: '{link}' -> '{link}'")
-                
-                # Title match
-                elif link in title_to_filename:
-                    target_filename = title_to_filename[link]
-                    target_note = filename_to_note[target_filename]
-                    print(f"  Title match: '{link}' -> '{target_filename}'")
-                
-                # Try partial matches (case insensitive)
-                else:
-                    # Check if any filename starts with the link text (case insensitive)
-                    link_lower = link.lower()
-                    for filename, note_data_target in filename_to_note.items():
-                        if filename.lower() == link_lower:
-                            target_note = note_data_target
-                            print(f"  Case-insensitive match: '{link}' -> '{filename}'")
-                            break
-                    
-                    # Check titles case insensitive
-                    if not target_note:
-                        for title, filename in title_to_filename.items():
-                            if title.lower() == link_lower:
-                                target_note = filename_to_note[filename]
-                                print(f"  Title case-insensitive match: '{link}' -> '{filename}'")
-                                break
-                
-                if target_note:
+                match = exact_index.get(link) or lower_index.get(link.lower())
+                if match:
+                    kind, filename, target_note = match
                     target_note['has_connections'] = True  # The target note has an incoming link
-                    print(f"  ✓ Marked '{link}' as having incoming connection")
-                else:
-                    print(f"  ✗ Could not resolve link '{link}' - no matching note found")
+                    if verbose:
+                        log.debug(f"  {kind} match: '{link}' -> '{filename}'")
+                        log.debug(f"  ✓ Marked '{link}' as having incoming connection")
+                elif verbose:
+                    log.debug(f"  ✗ Could not resolve link '{link}' - no matching note found")
     
+    flush_log()
     print(f"\nSummary: {files_with_links} files contain {total_links} total links")
     return notes
 
@@ -143,10 +236,18 @@ def update_frontmatter(file_path, set_archived=True):
     """Update a note's frontmatter to set archived status"""
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
+            # Check the head first so notes already in the right state never have their body read
+            content = file.read(HEAD_READ_SIZE)
+            frontmatter, note_content = parse_frontmatter(content)
+            if frontmatter and frontmatter.get('archived', False) == set_archived:
+                print(f"  Already in correct state: {os.path.basename(file_path)}")
+                return False
+            rest = file.read()
         
         # Parse frontmatter
-        frontmatter, note_content = parse_frontmatter(content)
+        if rest:
+            content += rest
+            frontmatter, note_content = parse_frontmatter(content)
         
         if not frontmatter:
             print(f"  Warning: No frontmatter found in {file_path}")
@@ -157,15 +258,27 @@ def update_frontmatter(file_path, set_archived=True):
             print(f"  Already in correct state: {os.path.basename(file_path)}")
             return False
         
-        # Update the archived status
-        frontmatter['archived'] = set_archived
+        # Splice just the 'archived:' line when it is a plain scalar, keeping the rest byte-identical
+        new_content = None
+        match = FRONTMATTER_PATTERN.match(content)
+        new_block, replaced = ARCHIVED_LINE_PATTERN.subn(
+            f"archived: {'true' if set_archived else 'false'}", match.group(1), count=1
+        )
+        if replaced == 1:
+            spliced = yaml.load(new_block, Loader=_YamlLoader)
+            if isinstance(spliced, dict) and spliced.get('archived') is set_archived:
+                new_content = content[:match.start(1)] + new_block + content[match.end(1):]
         
-        # Reconstruct the file
-        new_content = f"---\n{yaml.dump(frontmatter, default_flow_style=False, allow_unicode=True)}---\n{note_content}"
+        if new_content is None:
+            # Update the archived status and reconstruct the whole frontmatter
+            frontmatter['archived'] = set_archived
+            new_content = f"---\n{yaml.dump(frontmatter, Dumper=_YamlDumper, default_flow_style=False, allow_unicode=True)}---\n{note_content}"
         
-        # Write back to the file
-        with open(file_path, 'w', encoding='utf-8') as file:
+        # Write to a temp file, then atomically replace the note
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
             file.write(new_content)
+        os.replace(tmp_path, file_path)
         
         return True
     
@@ -174,6 +287,11 @@ def update_frontmatter(file_path, set_archived=True):
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description="Archive notes that have outgoing or incoming [[links]]")
+    parser.add_argument('--verbose', action='store_true', help='Log how every link is resolved')
+    args = parser.parse_args()
+    setup_logging(args.verbose)
+    
     print(f"Scanning notes in {VAULT_DIR}...")
     notes = load_notes()
     
@@ -194,7 +312,7 @@ def main():
         print("No connected notes found. This might indicate an issue with link detection.")
         print("\nDebugging: Checking for any [[]] patterns in first few files...")
         for i, (name, note) in enumerate(list(notes.items())[:5]):
-            matches = LINK_PATTERN.findall(note['note_content'])
+            matches = note['outgoing_links']
             if matches:
                 print(f"  {name}: found links {matches}")
         return
@@ -12,18 +12,38 @@ Usage:
 Notes:
   - Output path is fixed to tools/vault_export.json (intentionally stable for .gitignore)
   - Only markdown files (*.md) are included
-  - Any file under a directory named "Trashed" is excluded
+  - Any file under a directory named "Trashed" is excluded, as are .git/ and .obsidian/
   - Tags/labels are intentionally omitted from note metadata for now
+  - Frontmatter is parsed with PyYAML's libyaml-backed CSafeLoader when PyYAML was
+    built with libyaml (the default for the PyPI wheels), else the pure-Python SafeLoader
 """
 
 import argparse
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import Dict, Tuple, List, Set, Optional
+import hashlib
 import json
+import pickle
 import re
 
+try:
+    import orjson  # optional: much faster JSON encoding of the export
+except ImportError:
+    orjson = None
+
+try:
+    import yaml  # local dependency, already used in this repo
+    try:
+        from yaml import CSafeLoader as _YamlLoader
+    except ImportError:
+        from yaml import SafeLoader as _YamlLoader
+except Exception:
+    yaml = None  # still return raw strings if PyYAML missing
+
 
 class DateTimeEncoder(json.JSONEncoder):
     """Custom JSON encoder that handles datetime objects by converting them to ISO format strings."""
@@ -33,6 +53,12 @@ class DateTimeEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+# Frontmatter delimiter. Matched on the decoded text rather than raw bytes: read_text()
+# normalizes CRLF to '\n', so a bytes search for b"---\n" would miss CRLF-saved notes.
+FM_DELIM = "---\n"
+FM_DELIM_LEN = len(FM_DELIM)
+
+
 def parse_frontmatter(full_text: str) -> Tuple[str, Dict, str]:
     """Return (frontmatter_raw, frontmatter_dict, body)
 
@@ -40,20 +66,17 @@ def parse_frontmatter(full_text: str) -> Tuple[str, Dict, str]:
     - frontmatter_dict: parsed YAML as dict (empty dict on error/missing)
     - body: the remaining markdown content after frontmatter
     """
-    try:
-        import yaml  # local dependency, already used in this repo
-    except Exception:
-        yaml = None  # still return raw strings if PyYAML missing
-
-    if full_text.startswith("---\n"):
-        parts = full_text.split("---\n", 2)
-        if len(parts) >= 3:
-            fm_raw = parts[1]
-            body = parts[2]
+    if full_text.startswith(FM_DELIM):
+        # Same split as full_text.split("---\n", 2), but via one find and two slices
+        # (no intermediate list; the header is not copied twice)
+        end = full_text.find(FM_DELIM, FM_DELIM_LEN)
+        if end != -1:
+            fm_raw = full_text[FM_DELIM_LEN:end]
+            body = full_text[end + FM_DELIM_LEN:]
             fm_dict = {}
             if yaml is not None:
                 try:
-                    parsed = yaml.safe_load(fm_raw)
+                    parsed = yaml.load(fm_raw, Loader=_YamlLoader)
                     if isinstance(parsed, dict):
                         fm_dict = parsed
                 except Exception:
@@ -63,17 +86,6 @@ def parse_frontmatter(full_text: str) -> Tuple[str, Dict, str]:
     return "", {}, full_text
 
 
-def is_trashed(path: Path, vault_root: Path) -> bool:
-    """Return True if the path is inside a directory named 'Trashed' under vault_root."""
-    try:
-        rel = path.relative_to(vault_root)
-    except ValueError:
-        # not under vault
-        return False
-    parts = rel.parts
-    return "Trashed" in parts
-
-
 def coerce_list(value) -> list:
     if value is None:
         return []
@@ -99,13 +111,31 @@ def extract_meta(fm: Dict) -> Dict:
     }
 
 
-def discover_markdown_files(vault_root: Path) -> list:
-    files = []
-    for p in vault_root.rglob("*.md"):
-        if p.is_file() and not is_trashed(p, vault_root):
-            files.append(p)
+# Directories never descended into: trashed notes and tool/app metadata
+EXCLUDED_DIRS = {"Trashed", ".git", ".obsidian"}
+
+
+def _scan_md(root: str):
+    """Yield (Path, os.stat_result) for .md files under root using os.scandir.
+
+    Type checks and stat results come from each DirEntry's cache (stat needs no extra
+    syscall on Windows, and at most one on POSIX).
+
+    Directories in EXCLUDED_DIRS and symlinked directories are not descended into.
+    """
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in EXCLUDED_DIRS:
+                    yield from _scan_md(entry.path)
+            elif entry.name.endswith(".md") and entry.is_file():
+                yield Path(entry.path), entry.stat()
+
+
+def discover_markdown_files(vault_root: Path) -> List[Tuple[Path, os.stat_result]]:
+    files = list(_scan_md(str(vault_root)))
     # sort for deterministic ordering
-    files.sort(key=lambda x: x.as_posix().lower())
+    files.sort(key=lambda x: x[0].as_posix().lower())
     return files
 
 
@@ -132,8 +162,10 @@ def build_note_index(files: List[Path], vault_root: Path) -> Dict[str, List[str]
     return index
 
 
-MD_LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
 WIKILINK_RE = re.compile(r"\[\[([^\]]+)\]\]")
+# Markdown links [text](target) and wikilinks as one alternation:
+# group 2 set -> markdown link, group 3 set -> wikilink
+LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)]+)\)|\[\[([^\]]+)\]\]")
 
 
 def _strip_anchor_and_query(target: str) -> str:
@@ -142,7 +174,26 @@ def _strip_anchor_and_query(target: str) -> str:
     return base
 
 
-def _normalize_internal_path(candidate: Path, vault_root: Path) -> Optional[str]:
+def list_vault_files(vault_root: Path) -> Set[str]:
+    """Relative posix paths of every file under vault_root (any extension, nothing excluded)."""
+    files: Set[str] = set()
+    root = str(vault_root)
+    for dirpath, _dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        for name in filenames:
+            rel = name if rel_dir == "." else os.path.join(rel_dir, name)
+            files.add(rel.replace(os.sep, "/"))
+    return files
+
+
+def _normalize_internal_path(candidate: Path, vault_root: Path, vault_files: Optional[Set[str]] = None) -> Optional[str]:
+    if vault_files is not None:
+        # Pure string normalization against the pre-listed vault files: no syscalls for the common hit.
+        # A miss still goes through resolve() below, which handles case-insensitive filesystems and
+        # symlinked folders the string form cannot see.
+        rel = os.path.relpath(os.path.normpath(candidate), vault_root).replace(os.sep, "/")
+        if rel in vault_files:
+            return rel
     try:
         candidate = candidate.resolve()
         if not candidate.is_file():
@@ -153,95 +204,195 @@ def _normalize_internal_path(candidate: Path, vault_root: Path) -> Optional[str]
         return None
 
 
-def extract_links(text: str, current_file: Path, vault_root: Path, index: Dict[str, List[str]]) -> Tuple[Set[str], Set[str]]:
+def _add_markdown_link(target: str, current_file: Path, vault_root: Path,
+                       internal: Set[str], external: Set[str],
+                       vault_files: Optional[Set[str]] = None) -> None:
+    target = target.strip()
+    if target.startswith("http://") or target.startswith("https://"):
+        external.add(target)
+        return
+    if target.startswith("mailto:"):
+        return
+    cleaned = _strip_anchor_and_query(target)
+    # Resolve relative to current file directory
+    base_candidate = (current_file.parent / cleaned)
+    candidates: List[Path] = []
+    candidates.append(base_candidate)
+    if base_candidate.suffix.lower() != ".md":
+        candidates.append(base_candidate.with_suffix(".md"))
+    for cand in candidates:
+        rel = _normalize_internal_path(cand, vault_root, vault_files)
+        if rel:
+            internal.add(rel)
+            break
+
+
+def _add_wikilink(raw: str, index: Dict[str, List[str]], internal: Set[str]) -> None:
+    # handle alias and anchors
+    target = raw.split("|", 1)[0].strip()
+    target = _strip_anchor_and_query(target)
+    if not target:
+        return
+    key = target.lower()
+    # Path-like wikilink (folder/note)
+    if "/" in target or "\\" in target:
+        # normalize separators and try index lookups without extension
+        normalized = target.replace("\\", "/")
+        if normalized.lower().endswith(".md"):
+            normalized_no_ext = normalized[:-3].lower()
+        else:
+            normalized_no_ext = normalized.lower()
+        candidates = index.get(normalized_no_ext, [])
+        if candidates:
+            internal.add(candidates[0])
+            return
+    # Stem-based resolution
+    candidates = index.get(key, [])
+    if candidates:
+        internal.add(candidates[0])
+
+
+def extract_links(text: str, current_file: Path, vault_root: Path, index: Dict[str, List[str]],
+                  vault_files: Optional[Set[str]] = None) -> Tuple[Set[str], Set[str]]:
     """Return (internal_links_rel_paths, external_links_urls).
 
     - Internal links include markdown relative links and wikilinks, resolved to
       relative posix paths within the vault when possible.
     - External links capture http/https URLs from markdown links.
+    - vault_files (from list_vault_files) lets markdown link targets be checked in
+      memory; without it each target is resolved on disk.
     """
     internal: Set[str] = set()
     external: Set[str] = set()
 
-    # Markdown links
-    for _text, target in MD_LINK_RE.findall(text):
-        target = target.strip()
-        if target.startswith("http://") or target.startswith("https://"):
-            external.add(target)
-            continue
-        if target.startswith("mailto:"):
-            continue
-        cleaned = _strip_anchor_and_query(target)
-        # Resolve relative to current file directory
-        base_candidate = (current_file.parent / cleaned)
-        candidates: List[Path] = []
-        candidates.append(base_candidate)
-        if base_candidate.suffix.lower() != ".md":
-            candidates.append(base_candidate.with_suffix(".md"))
-        for cand in candidates:
-            rel = _normalize_internal_path(cand, vault_root)
-            if rel:
-                internal.add(rel)
-                break
-
-    # Wikilinks
-    for raw in WIKILINK_RE.findall(text):
-        # handle alias and anchors
-        target = raw.split("|", 1)[0].strip()
-        target = _strip_anchor_and_query(target)
-        if not target:
-            continue
-        key = target.lower()
-        # Path-like wikilink (folder/note)
-        if "/" in target or "\\" in target:
-            # normalize separators and try index lookups without extension
-            normalized = target.replace("\\", "/")
-            if normalized.lower().endswith(".md"):
-                normalized_no_ext = normalized[:-3].lower()
-            else:
-                normalized_no_ext = normalized.lower()
-            candidates = index.get(normalized_no_ext, [])
-            if candidates:
-                internal.add(candidates[0])
-                continue
-        # Stem-based resolution
-        candidates = index.get(key, [])
-        if candidates:
-            internal.add(candidates[0])
+    # One pass over the text for both markdown links and wikilinks
+    for m in LINK_RE.finditer(text):
+        if m.group(2) is not None:
+            _add_markdown_link(m.group(2), current_file, vault_root, internal, external, vault_files)
+            if "[[" in m.group(2):
+                # A wikilink starting inside a markdown link target would have been
+                # consumed by this match; pick it up as a separate wikilink pass did.
+                for wm in WIKILINK_RE.finditer(text, m.start(2)):
+                    if wm.start() >= m.end():
+                        break
+                    _add_wikilink(wm.group(1), index, internal)
+        else:
+            _add_wikilink(m.group(3), index, internal)
 
     return internal, external
 
 
+# Below this many notes, process start-up costs more than parallel parsing saves
+PARALLEL_PARSE_MIN_FILES = 64
+
+# Per-process context for _parse_note, set once by _init_parse_worker instead of per task
+_parse_ctx: Dict = {}
+
+
+def _init_parse_worker(vault_root: Path, index: Dict[str, List[str]], vault_files: Set[str]) -> None:
+    _parse_ctx["vault_root"] = vault_root
+    _parse_ctx["index"] = index
+    _parse_ctx["vault_files"] = vault_files
+
+
+def _parse_note(item: Tuple[Path, os.stat_result]) -> Dict:
+    """Read one note and return its first-pass record (metadata, content, outbound links)."""
+    md_file, md_stat = item
+    vault_root = _parse_ctx["vault_root"]
+    rel_path = md_file.relative_to(vault_root).as_posix()
+    text = md_file.read_text(encoding="utf-8")
+    fm_raw, fm_dict, body = parse_frontmatter(text)
+    meta = extract_meta(fm_dict)
+    size_bytes = md_stat.st_size  # stat cached during discovery
+    outbound_internal, external_links = extract_links(text, md_file, vault_root, _parse_ctx["index"], _parse_ctx["vault_files"])
+    return {
+        "rel_path": rel_path,
+        "filename": md_file.name,
+        "size_bytes": size_bytes,
+        "meta": meta,
+        "content": body.rstrip("\n"),
+        "outbound_internal": sorted(outbound_internal),
+        "external_links": sorted(external_links),
+    }
+
+
+# Parsed notes from the previous export, next to the output file. Entries are reused while a
+# note's (mtime_ns, size) and the set of vault files (which link resolution depends on) match.
+PARSE_CACHE_NAME = ".vault_export.cache.pickle"
+PARSE_CACHE_VERSION = 1
+
+
+def _load_parse_cache(cache_path: Path, link_context: str) -> Dict[str, Tuple[int, int, Dict]]:
+    try:
+        with cache_path.open("rb") as f:
+            cache = pickle.load(f)
+        if cache.get("version") == PARSE_CACHE_VERSION and cache.get("link_context") == link_context:
+            return cache["entries"]
+    except Exception:
+        pass
+    return {}
+
+
+def _save_parse_cache(cache_path: Path, link_context: str, entries: Dict[str, Tuple[int, int, Dict]]) -> None:
+    try:
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        with tmp_path.open("wb") as f:
+            pickle.dump({"version": PARSE_CACHE_VERSION, "link_context": link_context, "entries": entries},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"Warning: could not save parse cache {cache_path}: {e}")
+
+
 def export_vault(vault_root: Path, output_path: Path) -> Tuple[int, Path]:
-    files = discover_markdown_files(vault_root)
+    discovered = discover_markdown_files(vault_root)
+    files = [md_file for md_file, _stat in discovered]
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
     # Build index for link resolution
     index = build_note_index(files, vault_root)
-
-    # First pass: parse notes and collect outbound links
-    notes_temp: List[Dict] = []
-    for md_file in files:
-        rel_path = md_file.relative_to(vault_root).as_posix()
-        text = md_file.read_text(encoding="utf-8")
-        fm_raw, fm_dict, body = parse_frontmatter(text)
-        meta = extract_meta(fm_dict)
-        size_bytes = md_file.stat().st_size
-        outbound_internal, external_links = extract_links(text, md_file, vault_root, index)
-        notes_temp.append({
-            "rel_path": rel_path,
-            "filename": md_file.name,
-            "size_bytes": size_bytes,
-            "meta": meta,
-            "content": body.rstrip("\n"),
-            "outbound_internal": sorted(outbound_internal),
-            "external_links": sorted(external_links),
-        })
-
-    # Compute backlinks
+    # Every file (attachments and Trashed included) that markdown links may point to
+    vault_files = list_vault_files(vault_root)
+
+    # Reuse notes parsed by the previous export when neither they nor the vault's file set changed.
+    # The file set is keyed without EXCLUDED_DIRS (pruned at any depth, as in _scan_md): a backup
+    # commit adds objects under .git/ and must not throw the whole cache away.
+    cache_path = output_path.with_name(PARSE_CACHE_NAME)
+    context_files = sorted(rel for rel in vault_files if EXCLUDED_DIRS.isdisjoint(rel.split("/")[:-1]))
+    link_context = hashlib.sha256("\n".join([str(vault_root)] + context_files).encode("utf-8")).hexdigest()
+    cached = _load_parse_cache(cache_path, link_context)
+    notes_temp: List[Dict] = [None] * len(discovered)
+    pending: List[int] = []
+    for i, (md_file, md_stat) in enumerate(discovered):
+        hit = cached.get(md_file.relative_to(vault_root).as_posix())
+        if hit is not None and hit[0] == md_stat.st_mtime_ns and hit[1] == md_stat.st_size:
+            notes_temp[i] = hit[2]
+        else:
+            pending.append(i)
+
+    # First pass: parse notes and collect outbound links. Notes are independent and
+    # parsing is CPU-bound (YAML + regex), so large batches are spread over processes.
+    to_parse = [discovered[i] for i in pending]
+    if len(to_parse) >= PARALLEL_PARSE_MIN_FILES:
+        with ProcessPoolExecutor(initializer=_init_parse_worker, initargs=(vault_root, index, vault_files)) as ex:
+            parsed = list(ex.map(_parse_note, to_parse, chunksize=32))
+    else:
+        _init_parse_worker(vault_root, index, vault_files)
+        parsed = [_parse_note(item) for item in to_parse]
+    for i, note in zip(pending, parsed):
+        notes_temp[i] = note
+
+    _save_parse_cache(cache_path, link_context, {
+        note["rel_path"]: (md_stat.st_mtime_ns, md_stat.st_size, note)
+        for (_md_file, md_stat), note in zip(discovered, notes_temp)
+    })
+
+    # Compute backlinks. Paths come back from workers and the cache as separate copies;
+    # interning them stores each rel_path once however many notes link to it.
     backlinks_map: Dict[str, Set[str]] = {}
     for note in notes_temp:
-        source = note["rel_path"]
+        source = note["rel_path"] = sys.intern(note["rel_path"])
+        note["outbound_internal"] = [sys.intern(target) for target in note["outbound_internal"]]
         for target in note["outbound_internal"]:
             backlinks_map.setdefault(target, set()).add(source)
 
@@ -251,7 +402,7 @@ def export_vault(vault_root: Path, output_path: Path) -> Tuple[int, Path]:
         "export": {
             "generated_utc": generated,
             "vault_path": str(vault_root.resolve()),
-            "excluded_dirs": ["Trashed"],
+            "excluded_dirs": sorted(EXCLUDED_DIRS),
             "notes_count": len(files),
             "version": "2.0",
         },
@@ -276,8 +427,19 @@ def export_vault(vault_root: Path, output_path: Path) -> Tuple[int, Path]:
             "content": note["content"],
         })
 
-    with output_path.open("w", encoding="utf-8") as out:
-        json.dump(data, out, ensure_ascii=False, indent=2, cls=DateTimeEncoder)
+    payload = None
+    if orjson is not None:
+        # Same layout as the json fallback (2-space indent, unescaped UTF-8); datetimes are native.
+        # OPT_NON_STR_KEYS stringifies YAML keys like 2024 or true the way json.dump does.
+        try:
+            payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            payload = None  # e.g. integers wider than 64 bits: leave them to the json module
+    if payload is not None:
+        output_path.write_bytes(payload)
+    else:
+        with output_path.open("w", encoding="utf-8") as out:
+            json.dump(data, out, ensure_ascii=False, indent=2, cls=DateTimeEncoder)
 
     return len(files), output_path
 
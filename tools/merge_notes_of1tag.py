@@ -1,25 +1,48 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
 import glob
 import yaml
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from dataclasses import dataclass
+from typing import FrozenSet, Set
+
+# libyaml-backed loader/dumper are much faster when PyYAML was built with them
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
 
 # Configuration
 VAULT_DIR = "KeepVault"
 # Regex to find inline tags like #tag, #tag-with-hyphen, #tag/with/slash
 TAG_PATTERN_INLINE = re.compile(r'#([\w\/-]+)')
+# The same tags when they stand alone, i.e. followed by whitespace, another '#' or the end
+STANDALONE_TAG_PATTERN_INLINE = re.compile(r'#([\w\/-]+)(?![^\s#])')
+# A '---' fence line opening or closing the YAML frontmatter
+FRONTMATTER_FENCE_PATTERN = re.compile(r"^---\s*$", re.MULTILINE)
+# Top-level vault folders whose notes are never scanned or merged
+EXCLUDED_DIRS = {"Archived", "Trashed"}
+# Tag names PyYAML emits unquoted: a letter or '_' then tag characters (BMP only), minus the
+# words YAML would read as booleans or null
+PLAIN_YAML_SCALAR_PATTERN = re.compile(r'[^\W\d][\w\/-]*')
+YAML_RESERVED_WORDS = {'yes', 'no', 'y', 'n', 'true', 'false', 'on', 'off', 'null'}
+# Below this many notes, starting worker processes costs more than it saves
+PARALLEL_SCAN_MIN_FILES = 64
 
 def parse_frontmatter_and_body(full_content):
     """Extracts YAML frontmatter (as dict) and body content from a note."""
     if full_content.startswith("---"):
-        parts = re.split(r"^---\s*$", full_content, 2, flags=re.MULTILINE)
+        # maxsplit=2 stops scanning at the closing fence, so the body is only copied, not searched
+        parts = FRONTMATTER_FENCE_PATTERN.split(full_content, 2)
         if len(parts) >= 3: # An empty string before the first '---', YAML, body
             frontmatter_text = parts[1]
             body_content = parts[2].lstrip()
             try:
-                frontmatter_dict = yaml.safe_load(frontmatter_text)
+                frontmatter_dict = yaml.load(frontmatter_text, Loader=_YamlLoader)
                 if not isinstance(frontmatter_dict, dict):
                     frontmatter_dict = {} # Ensure it's a dict if parsing returns non-dict (e.g. null)
                 return frontmatter_dict, body_content
@@ -27,102 +50,145 @@ def parse_frontmatter_and_body(full_content):
                 return {}, full_content # Malformed YAML, treat as body
     return {}, full_content # No frontmatter
 
-def _add_tags_from_key(frontmatter, key, all_tags_set):
-    """Helper to add tags from a specific frontmatter key (e.g., 'labels' or 'tags')."""
-    if key in frontmatter:
-        tags_data = frontmatter[key]
+def _frontmatter_tag_values(frontmatter):
+    """Returns the string values of the frontmatter 'labels' and 'tags' keys, as written."""
+    values = set()
+    for key in ('labels', 'tags'):
+        tags_data = frontmatter.get(key)
         if isinstance(tags_data, list):
-            for tag_item in tags_data:
-                if isinstance(tag_item, str):
-                    all_tags_set.add(tag_item.lstrip('#'))
+            values.update(tag_item for tag_item in tags_data if isinstance(tag_item, str))
         elif isinstance(tags_data, str):
-            all_tags_set.add(tags_data.lstrip('#'))
+            values.add(tags_data)
+    return frozenset(values)
 
-def scan_for_all_tags(vault_path_str):
-    """Scans all notes for inline tags and YAML 'labels'/'tags', returns a sorted list of unique tag names."""
-    all_tags = set()
-    vault_path = Path(vault_path_str)
-    archived_dir = (vault_path / "Archived").as_posix()
-    trashed_dir = (vault_path / "Trashed").as_posix()
-
-    for file_path_obj in vault_path.glob("**/*.md"):
-        file_path_str = file_path_obj.as_posix()
-        if file_path_str.startswith(archived_dir) or \
-           file_path_str.startswith(trashed_dir):
-            continue
+def iter_active_markdown_files(vault_path):
+    """Yields every .md file in the vault, pruning the top-level Archived/Trashed folders.
+
+    Entries are classified from os.scandir's DirEntry cache, and a folder's notes come
+    before its subfolders', in the same order os.walk gave.
+    """
+    stack = [(str(vault_path), True)]
+    while stack:
+        dirpath, is_root = stack.pop()
+        md_paths, subdirs = [], []
         try:
-            with open(file_path_obj, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            frontmatter, body_content_for_inline_scan = parse_frontmatter_and_body(content)
-            
-            inline_tags_found = TAG_PATTERN_INLINE.findall(body_content_for_inline_scan)
-            for tag in inline_tags_found:
-                all_tags.add(tag) 
-            
-            if frontmatter:
-                _add_tags_from_key(frontmatter, 'labels', all_tags)
-                _add_tags_from_key(frontmatter, 'tags', all_tags)
-                
-        except Exception as e:
-            print(f"Warning: Error scanning {file_path_obj.name} for tags: {e}")
-    return sorted(list(all_tags))
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        if not entry.is_symlink() and not (is_root and entry.name in EXCLUDED_DIRS):
+                            subdirs.append(entry.path)
+                    elif entry.name.endswith(".md"):
+                        md_paths.append(entry.path)
+        except OSError:
+            continue
+        for md_path in md_paths:
+            yield Path(md_path)
+        stack.extend((subdir, False) for subdir in reversed(subdirs))
+
+@dataclass
+class NoteRecord:
+    """A note read and parsed once, shared by the tag listing, tag selection and merge steps."""
+    path: Path
+    body: str
+    frontmatter_tags: FrozenSet[str]  # 'labels'/'tags' values exactly as written
+    inline_tags: Set[str]       # TAG_PATTERN_INLINE matches in the body
+    standalone_inline_tags: Set[str]  # STANDALONE_TAG_PATTERN_INLINE matches in the body
+
+def parse_one(file_path_obj):
+    """Reads and parses one note; returns its NoteRecord, or None if it could not be read."""
+    try:
+        with open(file_path_obj, 'r', encoding='utf-8') as file:
+            full_content = file.read()
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Warning: Error scanning {file_path_obj.name}: {e}")
+        return None
+    
+    try:
+        frontmatter, body = parse_frontmatter_and_body(full_content)
+    except ValueError as e: # YAML errors are handled inside; this is e.g. an impossible date value
+        print(f"Warning: Error scanning {file_path_obj.name}: {e}")
+        return None
+    
+    return NoteRecord(
+        path=file_path_obj,
+        body=body,
+        frontmatter_tags=_frontmatter_tag_values(frontmatter),
+        inline_tags=set(TAG_PATTERN_INLINE.findall(body)) if '#' in body else set(),
+        standalone_inline_tags=set(STANDALONE_TAG_PATTERN_INLINE.findall(body)) if '#' in body else set(),
+    )
+
+def scan_vault(vault_path_str):
+    """Reads every active note once and returns its NoteRecord."""
+    note_paths = list(iter_active_markdown_files(Path(vault_path_str)))
+    if len(note_paths) >= PARALLEL_SCAN_MIN_FILES:
+        # Reading and YAML-parsing notes is CPU-bound and independent per note
+        with ProcessPoolExecutor() as executor:
+            records = list(executor.map(parse_one, note_paths, chunksize=32))
+    else:
+        records = [parse_one(file_path_obj) for file_path_obj in note_paths]
+    return [record for record in records if record is not None]
+
+def scan_for_all_tags(records):
+    """Collects inline tags and YAML 'labels'/'tags' from scanned notes, returns a sorted list of unique tag names."""
+    all_tags = set()
+    for record in records:
+        all_tags.update(record.inline_tags)
+        all_tags.update(tag.lstrip('#') for tag in record.frontmatter_tags)
+    return sorted(all_tags)
+
+def build_tag_index(records):
+    """Maps each frontmatter tag value and standalone inline tag to its notes, in scan order."""
+    tag_index = {}
+    for record in records:
+        for tag in record.frontmatter_tags | record.standalone_inline_tags:
+            tag_index.setdefault(tag, []).append(record)
+    return tag_index
 
-def get_notes_by_selected_tag(vault_path_str, selected_tag_name):
+def compile_inline_tag_pattern(tag_name, flags=0):
+    """Compiles a pattern matching #tag_name as a whole inline tag (not a prefix of a longer one)."""
+    return re.compile(r'#' + re.escape(tag_name) + r'(?![^\s#])', flags)
+
+def get_notes_by_selected_tag(records, tag_index, selected_tag_name, inline_tag_to_search_pattern):
     """
     Finds notes that contain the selected tag either in their body (e.g., #selected_tag_name)
     or as a label/tag in their frontmatter (e.g., labels: [selected_tag_name] or tags: [selected_tag_name]).
-    Returns a list of (Path object, full_content string).
+    tag_index is build_tag_index(records); inline_tag_to_search_pattern is
+    compile_inline_tag_pattern(selected_tag_name).
+    Returns the matching NoteRecords.
     """
-    tagged_notes_data = []
-    vault_path = Path(vault_path_str)
-    archived_dir = (vault_path / "Archived").as_posix()
-    trashed_dir = (vault_path / "Trashed").as_posix()
-    
-    inline_tag_to_search_pattern = re.compile(r'#(' + re.escape(selected_tag_name) + r')(?![^\s#])')
+    if TAG_PATTERN_INLINE.fullmatch('#' + selected_tag_name):
+        # A #tag made only of tag characters matches inline exactly where it stands alone,
+        # so the index already holds every note that carries it
+        return tag_index.get(selected_tag_name, [])
 
-    for file_path_obj in vault_path.glob("**/*.md"):
-        file_path_str = file_path_obj.as_posix()
-        if file_path_str.startswith(archived_dir) or \
-           file_path_str.startswith(trashed_dir):
-            continue
-        
-        try:
-            with open(file_path_obj, 'r', encoding='utf-8') as file:
-                full_content = file.read()
+    # Other names (e.g. frontmatter labels with spaces) need the body search.
+    # The literal '#tag' check rejects most notes before the boundary regex has to run
+    needle = '#' + selected_tag_name
+    return [record for record in records
+            if selected_tag_name in record.frontmatter_tags
+            or (needle in record.body and inline_tag_to_search_pattern.search(record.body))]
 
-            frontmatter, body_for_inline_check = parse_frontmatter_and_body(full_content)
-            
-            found_by_inline = False
-            if inline_tag_to_search_pattern.search(body_for_inline_check):
-                 found_by_inline = True
-
-            found_by_frontmatter = False
-            if frontmatter:
-                if 'labels' in frontmatter:
-                    fm_labels = frontmatter['labels']
-                    if isinstance(fm_labels, list) and selected_tag_name in fm_labels:
-                        found_by_frontmatter = True
-                    elif isinstance(fm_labels, str) and selected_tag_name == fm_labels:
-                        found_by_frontmatter = True
-                
-                if not found_by_frontmatter and 'tags' in frontmatter:
-                    fm_tags = frontmatter['tags']
-                    if isinstance(fm_tags, list) and selected_tag_name in fm_tags:
-                        found_by_frontmatter = True
-                    elif isinstance(fm_tags, str) and selected_tag_name == fm_tags:
-                        found_by_frontmatter = True
-            
-            if found_by_inline or found_by_frontmatter:
-                tagged_notes_data.append((file_path_obj, full_content))
-        except Exception as e:
-            print(f"Warning: Error reading/processing {file_path_obj.name} for merging: {e}")
-    return tagged_notes_data
+def format_merged_frontmatter(merged_note_title, tag_name):
+    """
+    Formats the merged note's fixed frontmatter exactly as yaml.dump(sort_keys=True) would.
+    Returns None when tag_name may need quoting or the title could be line-wrapped, in which
+    case the caller falls back to the YAML dumper.
+    """
+    if (not PLAIN_YAML_SCALAR_PATTERN.fullmatch(tag_name) or max(tag_name) > '\uffff'
+            or tag_name.lower() in YAML_RESERVED_WORDS or len(merged_note_title) > 70):
+        return None
+    return (f"---\narchived: false\nlabels:\n- {tag_name}\npinned: false\n"
+            f"tags:\n- {tag_name}\ntitle: {merged_note_title}\ntrashed: false\n---\n")
+
+def main(verbose=False):
+    if _YamlLoader is yaml.SafeLoader:
+        print("Note: PyYAML was built without libyaml, so scanning large vaults will be slower.")
 
-def main():
     # 1. Scan for all tags
     print(f"Scanning all notes in '{VAULT_DIR}' for available tags...")
-    available_tags = scan_for_all_tags(VAULT_DIR)
+    records = scan_vault(VAULT_DIR)
+    available_tags = scan_for_all_tags(records)
+    tag_index = build_tag_index(records)
 
     if not available_tags:
         print("No tags found in the vault. Exiting.")
@@ -158,8 +224,13 @@ def main():
 
 
     # 4. Find notes with the selected tag
+    # Inline tag patterns, compiled once per run: selection is case-sensitive, while the
+    # tag is removed from merged bodies in any case.
+    inline_tag_to_search_pattern = compile_inline_tag_pattern(selected_tag_name)
+    tag_to_remove_from_body_pattern = compile_inline_tag_pattern(selected_tag_name, re.IGNORECASE)
+
     print(f"\nScanning notes for items related to tag '{selected_tag_name}'...")
-    notes_to_merge_data = get_notes_by_selected_tag(VAULT_DIR, selected_tag_name)
+    notes_to_merge_data = get_notes_by_selected_tag(records, tag_index, selected_tag_name, inline_tag_to_search_pattern)
 
     if not notes_to_merge_data:
         print(f"No notes found for tag '{selected_tag_name}'. Nothing to merge. Exiting.")
@@ -168,27 +239,7 @@ def main():
     print(f"Found {len(notes_to_merge_data)} notes to merge for tag '{selected_tag_name}'.")
 
     # 5. Merge logic
-    merged_content_parts = []
-    original_file_paths_to_delete = []
-    
-    # Pattern to remove the selected tag if it appears inline in the content body.
-    # This should match #tagname, ensuring it's the whole tag.
-    tag_to_remove_from_body_pattern = re.compile(r'#' + re.escape(selected_tag_name) + r'(?![^\s#])', re.IGNORECASE)
-
-
-    for file_path_obj, full_content in notes_to_merge_data:
-        original_file_paths_to_delete.append(file_path_obj)
-        
-        _, body_for_merging = parse_frontmatter_and_body(full_content)
-        
-        cleaned_body = tag_to_remove_from_body_pattern.sub("", body_for_merging).strip()
-        
-        merged_content_parts.append(f"## Content from: {file_path_obj.name}\n\n{cleaned_body}\n\n---")
-
-    final_merged_body = "\n".join(merged_content_parts).strip()
-    # Ensure the last entry also has a separator if content exists and it wasn't just an empty note
-    if final_merged_body and not final_merged_body.endswith("\n---"):
-         final_merged_body += "\n---" 
+    original_file_paths_to_delete = [record.path for record in notes_to_merge_data]
 
     new_frontmatter_dict = {
         'title': merged_note_title,
@@ -199,19 +250,20 @@ def main():
         'pinned': False
     }
     
-    yaml_frontmatter_str = ""
-    try:
-        # Ensure consistent key order for better diffs if the file is modified later
-        yaml_frontmatter_str = f"---\n{yaml.dump(new_frontmatter_dict, sort_keys=True, allow_unicode=True, Dumper=yaml.SafeDumper)}---\n"
-    except TypeError: # Fallback if Dumper arg isn't supported in older PyYAML or specific setup
-        yaml_frontmatter_str = f"---\n{yaml.dump(new_frontmatter_dict, sort_keys=True, allow_unicode=True)}---\n"
-    except Exception as e:
-        print(f"Warning: Error generating YAML frontmatter: {e}. Using basic dump.")
-        # Basic fallback
-        yaml_frontmatter_str = f"---\ntitle: {merged_note_title}\nlabels:\n  - {selected_tag_name}\ntags:\n  - {selected_tag_name}\narchived: false\ntrashed: false\npinned: false\n---\n"
+    # Simple tag names are written directly; anything that may need quoting goes through PyYAML
+    yaml_frontmatter_str = format_merged_frontmatter(merged_note_title, selected_tag_name)
+    if yaml_frontmatter_str is None:
+        try:
+            # Ensure consistent key order for better diffs if the file is modified later
+            yaml_frontmatter_str = f"---\n{yaml.dump(new_frontmatter_dict, sort_keys=True, allow_unicode=True, Dumper=_YamlDumper)}---\n"
+        except TypeError: # Fallback if Dumper arg isn't supported in older PyYAML or specific setup
+            yaml_frontmatter_str = f"---\n{yaml.dump(new_frontmatter_dict, sort_keys=True, allow_unicode=True)}---\n"
+        except Exception as e:
+            print(f"Warning: Error generating YAML frontmatter: {e}. Using basic dump.")
+            # Basic fallback
+            yaml_frontmatter_str = f"---\ntitle: {merged_note_title}\nlabels:\n  - {selected_tag_name}\ntags:\n  - {selected_tag_name}\narchived: false\ntrashed: false\npinned: false\n---\n"
 
 
-    new_note_full_content = yaml_frontmatter_str + final_merged_body
     new_note_path = Path(VAULT_DIR) / merged_note_filename
     
     if new_note_path in original_file_paths_to_delete:
@@ -219,8 +271,17 @@ def main():
         print("It will be overwritten. If this is a re-run, previous merged content might be lost from it.")
 
     try:
-        with open(new_note_path, 'w', encoding='utf-8') as file:
-            file.write(new_note_full_content)
+        # Stream one section per note instead of joining every body into one big string.
+        # Each section ends with '---', so the note always ends with a separator.
+        with open(new_note_path, 'w', encoding='utf-8', buffering=1 << 20) as file:
+            file.write(yaml_frontmatter_str)
+            for i, record in enumerate(notes_to_merge_data):
+                # Notes selected through frontmatter alone often have no '#' to remove
+                body = record.body
+                cleaned_body = (tag_to_remove_from_body_pattern.sub("", body) if '#' in body else body).strip()
+                if i:
+                    file.write("\n")
+                file.write(f"## Content from: {record.path.name}\n\n{cleaned_body}\n\n---")
         print(f"\nSuccessfully created/updated merged note: {new_note_path}")
     except Exception as e:
         print(f"Error writing new note {new_note_path}: {e}")
@@ -229,13 +290,15 @@ def main():
 
     print("\nDeleting original tagged notes...")
     deleted_count = 0
+    resolved_new_note_path = new_note_path.resolve()
     for file_path_obj in original_file_paths_to_delete:
-        if file_path_obj.resolve() == new_note_path.resolve():
+        if file_path_obj.resolve() == resolved_new_note_path:
             print(f"Skipping deletion of '{file_path_obj.name}' as it is the merged target file.")
             continue
         try:
             os.remove(file_path_obj)
-            print(f"Deleted: {file_path_obj.name}")
+            if verbose:
+                print(f"Deleted: {file_path_obj.name}")
             deleted_count += 1
         except Exception as e:
             print(f"Error deleting file {file_path_obj.name}: {e}")
@@ -249,4 +312,7 @@ if __name__ == "__main__":
     except ImportError:
         print("PyYAML library is not installed. Please install it by running: pip install PyYAML")
         exit(1)
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Merge every active note carrying a chosen tag into one note.")
+    parser.add_argument("--verbose", action="store_true", help="List each original note as it is deleted.")
+    args = parser.parse_args()
+    main(verbose=args.verbose) 
\ No newline at end of file
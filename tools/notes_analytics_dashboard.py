@@ -18,38 +18,182 @@ import os
 import re
 import yaml
 import json
-from datetime import datetime, timedelta
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 from collections import Counter, defaultdict
 from dataclasses import dataclass, asdict
 from typing import List, Dict, Optional, Set, Tuple
 import argparse
+import heapq
+import importlib.util
 import sys
 
-# Check for required packages and install if missing
+# libyaml-backed loader is much faster when PyYAML was built with it
 try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Check for required packages without importing them: the plotting stack takes seconds
+# to load and is only needed once charts are built (see _load_chart_libraries)
+REQUIRED_PACKAGES = ['matplotlib', 'seaborn', 'pandas', 'numpy', 'wordcloud', 'plotly']
+_missing = [name for name in REQUIRED_PACKAGES if importlib.util.find_spec(name) is None]
+if _missing:
+    print(f"Missing required package: No module named '{_missing[0]}'")
+    print("Please install required packages:")
+    print("pip install matplotlib seaborn pandas numpy wordcloud plotly")
+    sys.exit(1)
+
+plt = sns = pd = np = WordCloud = go = make_subplots = None
+
+def _load_chart_libraries():
+    """Import the plotting stack into module globals on first use"""
+    global plt, sns, pd, np, WordCloud, go, make_subplots
+    if plt is not None:
+        return
     import matplotlib
     matplotlib.use('Agg')  # Use non-interactive backend
     import matplotlib.pyplot as plt
-    import matplotlib.dates as mdates
-    from matplotlib.patches import Wedge
     import seaborn as sns
     import pandas as pd
     import numpy as np
     from wordcloud import WordCloud
     import plotly.graph_objects as go
-    import plotly.express as px
     from plotly.subplots import make_subplots
-    import plotly.offline as pyo
-except ImportError as e:
-    print(f"Missing required package: {e}")
-    print("Please install required packages:")
-    print("pip install matplotlib seaborn pandas numpy wordcloud plotly")
-    sys.exit(1)
 
-@dataclass
+try:
+    import ciso8601  # Optional C ISO 8601 parser, much faster than the strptime loop
+except ImportError:
+    ciso8601 = None
+
+# Below this many notes, starting worker processes costs more than it saves
+PARALLEL_SCAN_MIN_FILES = 64
+
+# Content patterns, compiled once instead of per note
+INTERNAL_LINK_PATTERN = re.compile(r'\[\[([^\]]+)\]\]')
+EXTERNAL_LINK_PATTERN = re.compile(r'\[([^\]]*)\]\(([^)]+)\)')
+HEADING_PATTERN = re.compile(r'^#+\s', re.MULTILINE)
+LIST_ITEM_PATTERN = re.compile(r'^\s*[-*+]\s', re.MULTILINE)
+WORD_CLOUD_STOPWORD_PATTERN = re.compile(r'\b(the|and|or|but|in|on|at|to|for|of|with|by|a|an)\b', re.IGNORECASE)
+WORD_CLOUD_PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+
+SEASON_BY_MONTH = ['Winter', 'Winter', 'Spring', 'Spring', 'Spring',
+                   'Summer', 'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter']
+
+DATETIME_FORMATS = [
+    '%Y-%m-%dT%H:%M:%S.%f%z',
+    '%Y-%m-%dT%H:%M:%S.%fZ',
+    '%Y-%m-%dT%H:%M:%S%z',
+    '%Y-%m-%dT%H:%M:%SZ',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d'
+]
+
+# Notes analyzed by the previous run, next to the output file. Entries are reused while a
+# note's (mtime_ns, size) match.
+ANALYSIS_CACHE_NAME = ".notes_analytics.cache.pickle"
+ANALYSIS_CACHE_VERSION = 1
+
+def _load_analysis_cache(cache_path: Path) -> Dict[str, Tuple[int, int, 'NoteMetadata']]:
+    try:
+        with cache_path.open("rb") as f:
+            cache = pickle.load(f)
+        if cache.get("version") == ANALYSIS_CACHE_VERSION:
+            return cache["entries"]
+    except Exception:
+        pass
+    return {}
+
+def _save_analysis_cache(cache_path: Path, entries: Dict[str, Tuple[int, int, 'NoteMetadata']]) -> None:
+    try:
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        with tmp_path.open("wb") as f:
+            pickle.dump({"version": ANALYSIS_CACHE_VERSION, "entries": entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"Warning: could not save analysis cache {cache_path}: {e}")
+
+def iter_markdown_files(root: Path):
+    """Yield .md paths in rglob order, reading each directory once instead of twice"""
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except PermissionError:
+        return
+    subdirs = []
+    for entry in entries:
+        if entry.name.endswith('.md'):
+            yield root / entry.name
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+        except OSError:
+            pass
+    for name in subdirs:
+        yield from iter_markdown_files(root / name)
+
+def _parse_iso_fast(dt_str: str) -> Optional[datetime]:
+    """Parse the fixed-width layouts of DATETIME_FORMATS with fromisoformat, else None"""
+    n = len(dt_str)
+    if n < 10 or not dt_str.isascii() or dt_str[4] != '-' or dt_str[7] != '-':
+        return None
+    if n > 10:
+        if n < 19 or dt_str[10] not in 'T ' or dt_str[13] != ':' or dt_str[16] != ':':
+            return None
+        rest = dt_str[19:]
+        if dt_str[10] == ' ':
+            if rest:
+                return None
+        else:
+            if rest[:1] == '.':
+                if not rest[1:7].isdigit() or len(rest) < 7:
+                    return None
+                rest = rest[7:]
+            if rest != 'Z' and (len(rest) != 6 or rest[0] not in '+-' or rest[3] != ':'
+                                or rest[4] not in '012345'):
+                return None
+    try:
+        return datetime.fromisoformat(dt_str)
+    except ValueError:
+        return None
+
+# DATETIME_FORMATS narrowed by shape, so strptime is not tried (and raised from) for
+# formats that cannot match. strptime ignores case, so the 'T' separator may be 't'.
+_T_FRACTION_FORMATS = DATETIME_FORMATS[0:4]
+_T_FORMATS = DATETIME_FORMATS[2:4]
+_SPACE_FORMATS = DATETIME_FORMATS[4:6]
+
+def _candidate_formats(dt_str: str) -> List[str]:
+    if 'T' in dt_str or 't' in dt_str:
+        return _T_FRACTION_FORMATS if '.' in dt_str else _T_FORMATS
+    return _SPACE_FORMATS
+
+@lru_cache(maxsize=None)
+def _parse_datetime_cached(dt_str: str) -> Optional[datetime]:
+    """Parse datetime string, memoized since batch-imported notes share timestamps"""
+    if ciso8601 is not None:
+        try:
+            return ciso8601.parse_datetime(dt_str)
+        except ValueError:
+            pass
+    # sync.py writes isoformat() timestamps, so the strptime loop is rarely needed
+    parsed = _parse_iso_fast(dt_str)
+    if parsed is not None:
+        return parsed
+    for fmt in _candidate_formats(dt_str):
+        try:
+            return datetime.strptime(dt_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+@dataclass(slots=True)
 class NoteMetadata:
-    """Represents metadata extracted from a note file"""
+    """Represents metadata extracted from a note file (slotted: no per-note __dict__)"""
     id: str
     title: str
     color: str
@@ -86,10 +230,11 @@ class NotesAnalyzer:
             return {}, content
             
         try:
-            parts = content.split('---', 2)
-            if len(parts) >= 3:
-                frontmatter = yaml.safe_load(parts[1])
-                body = parts[2].strip()
+            # Same split as content.split('---', 2), without building the list
+            end = content.find('---', 3)
+            if end != -1:
+                frontmatter = yaml.load(content[3:end], Loader=_YamlLoader)
+                body = content[end + 3:].strip()
                 return frontmatter or {}, body
         except yaml.YAMLError:
             pass
@@ -99,49 +244,35 @@ class NotesAnalyzer:
         """Parse datetime string from various formats"""
         if not dt_str:
             return None
-        
-        # Handle different datetime formats
-        formats = [
-            '%Y-%m-%dT%H:%M:%S.%f%z',
-            '%Y-%m-%dT%H:%M:%S.%fZ',
-            '%Y-%m-%dT%H:%M:%S%z',
-            '%Y-%m-%dT%H:%M:%SZ',
-            '%Y-%m-%d %H:%M:%S',
-            '%Y-%m-%d'
-        ]
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(dt_str, fmt)
-            except ValueError:
-                continue
-        return None
+        return _parse_datetime_cached(dt_str)
     
     def extract_links(self, content: str) -> Tuple[List[str], List[str]]:
         """Extract internal [[links]] and external [links](urls)"""
+        if '[' not in content:
+            return [], []
+        
         # Internal wiki-style links
-        internal_links = re.findall(r'\[\[([^\]]+)\]\]', content)
+        internal_links = INTERNAL_LINK_PATTERN.findall(content)
         
         # External markdown links
-        external_pattern = r'\[([^\]]*)\]\(([^)]+)\)'
-        external_matches = re.findall(external_pattern, content)
+        external_matches = EXTERNAL_LINK_PATTERN.findall(content)
         external_links = [url for _, url in external_matches if url.startswith(('http', 'www'))]
         
         return internal_links, external_links
     
     def analyze_content(self, content: str) -> Dict:
         """Analyze markdown content for various metrics"""
-        lines = content.split('\n')
-        
         # Basic counts
         word_count = len(content.split())
-        line_count = len(lines)
+        line_count = content.count('\n') + 1
         content_length = len(content)
         
-        # Markdown elements
-        headings_count = len(re.findall(r'^#+\s', content, re.MULTILINE))
-        list_items_count = len(re.findall(r'^\s*[-*+]\s', content, re.MULTILINE))
-        code_blocks_count = len(re.findall(r'```', content)) // 2
+        # Markdown elements. Each regex only runs when its marker character occurs at all;
+        # these C-level substring checks are much cheaper than a per-line Python loop.
+        headings_count = len(HEADING_PATTERN.findall(content)) if '#' in content else 0
+        has_bullets = '-' in content or '*' in content or '+' in content
+        list_items_count = len(LIST_ITEM_PATTERN.findall(content)) if has_bullets else 0
+        code_blocks_count = content.count('```') // 2
         
         # Links
         internal_links, external_links = self.extract_links(content)
@@ -162,8 +293,11 @@ class NotesAnalyzer:
     def process_note(self, file_path: Path) -> Optional[NoteMetadata]:
         """Process a single note file and extract metadata"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            # Read bytes so the size comes from the read itself instead of another stat;
+            # decoding and newline translation then match text mode
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            content = raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
             
             frontmatter, body = self.parse_frontmatter(content)
             content_analysis = self.analyze_content(body)
@@ -182,7 +316,7 @@ class NotesAnalyzer:
             edited = self.parse_datetime(frontmatter.get('edited', ''))
             
             # File info
-            file_size = file_path.stat().st_size
+            file_size = len(raw)
             
             # Tags (if any)
             tags = frontmatter.get('tags', [])
@@ -209,15 +343,48 @@ class NotesAnalyzer:
             print(f"Error processing {file_path}: {e}")
             return None
     
-    def scan_vault(self):
-        """Scan the vault and process all notes"""
+    def scan_vault(self, cache_path: Optional[Path] = None):
+        """Scan the vault and process all notes, reusing unchanged ones from cache_path if given"""
         print(f"Scanning vault: {self.vault_path}")
         
-        markdown_files = list(self.vault_path.rglob("*.md"))
+        markdown_files = list(iter_markdown_files(self.vault_path))
         print(f"Found {len(markdown_files)} markdown files")
         
-        for file_path in markdown_files:
-            note = self.process_note(file_path)
+        cached = _load_analysis_cache(cache_path) if cache_path else {}
+        file_stats = [None] * len(markdown_files)
+        processed = [None] * len(markdown_files)
+        pending = []
+        for i, file_path in enumerate(markdown_files):
+            if cache_path:
+                try:
+                    file_stats[i] = file_path.stat()
+                except OSError:
+                    pass
+            hit = cached.get(str(file_path))
+            st = file_stats[i]
+            if hit is not None and st is not None and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+                processed[i] = hit[2]
+            else:
+                pending.append(i)
+        
+        to_process = [markdown_files[i] for i in pending]
+        if len(to_process) >= PARALLEL_SCAN_MIN_FILES:
+            # Reading, YAML parsing and regex counting are independent per note and CPU-bound
+            with ProcessPoolExecutor() as executor:
+                parsed = list(executor.map(self.process_note, to_process, chunksize=32))
+        else:
+            parsed = [self.process_note(file_path) for file_path in to_process]
+        for i, note in zip(pending, parsed):
+            processed[i] = note
+        
+        if cache_path:
+            _save_analysis_cache(cache_path, {
+                str(file_path): (st.st_mtime_ns, st.st_size, note)
+                for file_path, st, note in zip(markdown_files, file_stats, processed)
+                if note and st is not None
+            })
+        
+        for note in processed:
             if note:
                 self.notes.append(note)
         
@@ -228,48 +395,54 @@ class NotesAnalyzer:
         if not self.notes:
             return
         
-        # Basic stats
+        # All per-note stats in one pass over self.notes instead of one pass per metric
         total_notes = len(self.notes)
-        active_notes = [n for n in self.notes if not n.archived and not n.trashed]
-        archived_notes = [n for n in self.notes if n.archived]
-        trashed_notes = [n for n in self.notes if n.trashed]
-        pinned_notes = [n for n in self.notes if n.pinned]
+        active_count = archived_count = trashed_count = pinned_count = 0
+        total_words = total_size = 0
+        total_internal_links = total_external_links = 0
+        oldest_note = newest_note = None
+        color_counts = Counter()
+        link_target_counts = Counter()
+        for n in self.notes:
+            if n.archived:
+                archived_count += 1
+            if n.trashed:
+                trashed_count += 1
+            if not n.archived and not n.trashed:
+                active_count += 1
+            if n.pinned:
+                pinned_count += 1
+            
+            # Content stats
+            total_words += n.word_count
+            total_size += n.file_size
+            
+            # Date-based stats (first oldest/newest wins on ties, like min()/max())
+            if n.created:
+                if oldest_note is None or n.created < oldest_note.created:
+                    oldest_note = n
+                if newest_note is None or n.created > newest_note.created:
+                    newest_note = n
+            
+            # Color distribution and links analysis
+            color_counts[n.color] += 1
+            total_internal_links += len(n.internal_links)
+            total_external_links += len(n.external_links)
+            link_target_counts.update(n.internal_links)
         
-        # Content stats
-        total_words = sum(n.word_count for n in self.notes)
-        total_size = sum(n.file_size for n in self.notes)
         avg_words_per_note = total_words / total_notes if total_notes > 0 else 0
-        
-        # Date-based stats
-        notes_with_dates = [n for n in self.notes if n.created]
-        if notes_with_dates:
-            oldest_note = min(notes_with_dates, key=lambda x: x.created)
-            newest_note = max(notes_with_dates, key=lambda x: x.created)
-            date_range_days = (newest_note.created - oldest_note.created).days
-        else:
-            oldest_note = newest_note = None
-            date_range_days = 0
-        
-        # Color distribution
-        color_counts = Counter(n.color for n in self.notes)
-        
-        # Links analysis
-        total_internal_links = sum(len(n.internal_links) for n in self.notes)
-        total_external_links = sum(len(n.external_links) for n in self.notes)
+        date_range_days = (newest_note.created - oldest_note.created).days if oldest_note else 0
         
         # Most connected notes
-        link_targets = []
-        for note in self.notes:
-            link_targets.extend(note.internal_links)
-        most_linked = Counter(link_targets).most_common(10)
+        most_linked = link_target_counts.most_common(10)
         
         self.stats = {
             'basic': {
                 'total_notes': total_notes,
-                'active_notes': len(active_notes),
-                'archived_notes': len(archived_notes),
-                'trashed_notes': len(trashed_notes),
-                'pinned_notes': len(pinned_notes)
+                'active_notes': active_count,
+                'archived_notes': archived_count,
+                'trashed_notes': trashed_count,
+                'pinned_notes': pinned_count
             },
             'content': {
                 'total_words': total_words,
@@ -292,27 +465,44 @@ class NotesAnalyzer:
     def generate_charts(self) -> Dict[str, str]:
         """Generate various charts and return their HTML"""
         charts = {}
+        if not self.notes:
+            return charts
+        _load_chart_libraries()
         
         # Set style
         plt.style.use('seaborn-v0_8')
         sns.set_palette("husl")
         
+        # Creation days as one pandas index shared by the timeline charts; counting and
+        # sorting then run in pandas instead of per-note Python. The timezone is dropped
+        # without conversion so each note keeps the calendar day datetime.date() gave.
+        created_days = None
+        if self.notes:
+            created = [n.created.replace(tzinfo=None) for n in self.notes if n.created]
+            if created:
+                created_days = pd.DatetimeIndex(created).normalize()
+                daily_counts = created_days.value_counts().sort_index()
+        
+        # Dated notes in creation order plus the weekday/hour and season aggregates, built
+        # in one pass and sliced by the heatmap, velocity, momentum and seasonal charts.
+        created_notes = sorted((n for n in self.notes if n.created), key=lambda n: n.created)
+        weekdays, hours_of_day = [], []
+        season_word_counts = defaultdict(list)
+        for note in created_notes:
+            dt = note.created
+            weekdays.append(dt.weekday())
+            hours_of_day.append(dt.hour)
+            season_word_counts[SEASON_BY_MONTH[dt.month - 1]].append(note.word_count)
+        weekday_hour_counts = np.zeros((7, 24))
+        np.add.at(weekday_hour_counts, (np.array(weekdays, dtype=np.intp), np.array(hours_of_day, dtype=np.intp)), 1)
+        
         # 1. Notes creation timeline (CUMULATIVE)
         if self.notes:
-            dates_and_notes = [(n.created, n) for n in self.notes if n.created]
-            if dates_and_notes:
-                dates_and_notes.sort(key=lambda x: x[0])
-                dates = [d for d, _ in dates_and_notes]
-                
-                # Create daily counts
-                date_counts = Counter(d.date() for d in dates)
-                sorted_dates = sorted(date_counts.keys())
-                counts = [date_counts[d] for d in sorted_dates]
-                
+            if created_days is not None:
                 fig = go.Figure()
                 fig.add_trace(go.Scatter(
-                    x=sorted_dates,
-                    y=np.cumsum(counts),
+                    x=daily_counts.index.date,
+                    y=np.cumsum(daily_counts.to_numpy()),
                     mode='lines+markers',
                     name='Cumulative Notes',
                     line=dict(width=3, color='#2E86AB'),
@@ -329,18 +519,15 @@ class NotesAnalyzer:
                     showlegend=False
                 )
                 
-                charts['timeline'] = pyo.plot(fig, output_type='div', include_plotlyjs=False)
+                charts['timeline'] = fig.to_html(full_html=False, include_plotlyjs=False)
         
         # 1b. Notes creation timeline (NON-CUMULATIVE - Daily/Weekly/Monthly)
         if self.notes:
-            dates_and_notes = [(n.created, n) for n in self.notes if n.created]
-            if dates_and_notes:
-                dates = [d for d, _ in dates_and_notes]
-                
-                # Create different time aggregations
-                daily_counts = Counter(d.date() for d in dates)
-                weekly_counts = Counter(d.date() - timedelta(days=d.weekday()) for d in dates)
-                monthly_counts = Counter(d.strftime('%Y-%m') for d in dates)
+            if created_days is not None:
+                # Create different time aggregations (weeks start on Monday)
+                week_starts = created_days - pd.to_timedelta(created_days.weekday, unit='D')
+                weekly_counts = week_starts.value_counts().sort_index()
+                monthly_counts = pd.Index(created_days.strftime('%Y-%m')).value_counts().sort_index()
                 
                 # Create subplot with multiple views
                 fig = make_subplots(
@@ -350,31 +537,25 @@ class NotesAnalyzer:
                 )
                 
                 # Daily bars
-                daily_dates = sorted(daily_counts.keys())
-                daily_values = [daily_counts[d] for d in daily_dates]
                 fig.add_trace(go.Bar(
-                    x=daily_dates,
-                    y=daily_values,
+                    x=daily_counts.index.date,
+                    y=daily_counts.to_numpy(),
                     name='Daily',
                     marker_color='#3498db'
                 ), row=1, col=1)
                 
                 # Weekly bars
-                weekly_dates = sorted(weekly_counts.keys())
-                weekly_values = [weekly_counts[d] for d in weekly_dates]
                 fig.add_trace(go.Bar(
-                    x=weekly_dates,
-                    y=weekly_values,
+                    x=weekly_counts.index.date,
+                    y=weekly_counts.to_numpy(),
                     name='Weekly',
                     marker_color='#e74c3c'
                 ), row=2, col=1)
                 
                 # Monthly bars
-                monthly_labels = sorted(monthly_counts.keys())
-                monthly_values = [monthly_counts[m] for m in monthly_labels]
                 fig.add_trace(go.Bar(
-                    x=monthly_labels,
-                    y=monthly_values,
+                    x=list(monthly_counts.index),
+                    y=monthly_counts.to_numpy(),
                     name='Monthly',
                     marker_color='#2ecc71'
                 ), row=3, col=1)
@@ -386,7 +567,7 @@ class NotesAnalyzer:
                     showlegend=False
                 )
                 
-                charts['creation_patterns'] = pyo.plot(fig, output_type='div', include_plotlyjs=False)
+                charts['creation_patterns'] = fig.to_html(full_html=False, include_plotlyjs=False)
         
         # 2. Color distribution pie chart
         if self.stats['colors']:
@@ -420,54 +601,17 @@ class NotesAnalyzer:
                 height=400
             )
             
-            charts['colors'] = pyo.plot(fig, output_type='div', include_plotlyjs=False)
-        
-        # 3. Word count distribution
-        word_counts = [n.word_count for n in self.notes if n.word_count > 0]
-        if word_counts:
-            fig = go.Figure(data=[go.Histogram(
-                x=word_counts,
-                nbinsx=30,
-                marker_color='#17A2B8',
-                opacity=0.8
-            )])
-            
-            fig.update_layout(
-                title='Word Count Distribution',
-                xaxis_title='Words per Note',
-                yaxis_title='Number of Notes',
-                template='plotly_white',
-                height=400
-            )
-            
-            charts['word_dist'] = pyo.plot(fig, output_type='div', include_plotlyjs=False)
+            charts['colors'] = fig.to_html(full_html=False, include_plotlyjs=False)
         
         # 4. Activity heatmap (notes created by day of week and hour) - FIXED
         if self.notes:
-            created_dates = [n.created for n in self.notes if n.created]
-            if created_dates:
-                # Extract day of week and hour
-                activity_data = []
-                for dt in created_dates:
-                    activity_data.append({
-                        'day': dt.strftime('%A'),
-                        'hour': dt.hour,
-                        'date': dt.date()
-                    })
-                
-                # Create heatmap data
+            if created_notes:
                 days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
                 hours = list(range(24))
-                
-                heatmap_data = np.zeros((len(days), len(hours)))
-                
-                for item in activity_data:
-                    day_idx = days.index(item['day'])
-                    hour_idx = item['hour']
-                    heatmap_data[day_idx][hour_idx] += 1
+                heatmap_data = weekday_hour_counts
                 
                 # Debug: print some info
-                total_notes_with_time = len(activity_data)
+                total_notes_with_time = len(created_notes)
                 non_zero_cells = np.count_nonzero(heatmap_data)
                 max_value = np.max(heatmap_data)
                 
@@ -497,26 +641,19 @@ class NotesAnalyzer:
                     yaxis=dict(tickmode='array', tickvals=list(range(7)), ticktext=days)
                 )
                 
-                charts['heatmap'] = pyo.plot(fig, output_type='div', include_plotlyjs=False)
+                charts['heatmap'] = fig.to_html(full_html=False, include_plotlyjs=False)
         
         # 5. Advanced Analytics: Writing Velocity and Productivity Patterns
         if self.notes:
-            dates_and_notes = [(n.created, n) for n in self.notes if n.created and n.word_count > 0]
+            dates_and_notes = [(n.created, n) for n in created_notes if n.word_count > 0]
             if len(dates_and_notes) > 5:  # Need enough data
-                # Sort by date
-                dates_and_notes.sort(key=lambda x: x[0])
-                
                 # Calculate rolling averages and trends
                 window_size = min(7, len(dates_and_notes) // 4)  # Adaptive window
                 dates = [x[0].date() for x in dates_and_notes]
                 word_counts = [x[1].word_count for x in dates_and_notes]
                 
-                # Create rolling averages
-                rolling_avg = []
-                for i in range(len(word_counts)):
-                    start_idx = max(0, i - window_size + 1)
-                    avg = sum(word_counts[start_idx:i+1]) / (i - start_idx + 1)
-                    rolling_avg.append(avg)
+                # Create rolling averages (shorter leading windows, as min_periods=1)
+                rolling_avg = pd.Series(word_counts).rolling(window=window_size, min_periods=1).mean().to_numpy()
                 
                 fig = go.Figure()
                 
@@ -549,7 +686,7 @@ class NotesAnalyzer:
                     legend=dict(x=0.02, y=0.98)
                 )
                 
-                charts['writing_velocity'] = pyo.plot(fig, output_type='div', include_plotlyjs=False)
+                charts['writing_velocity'] = fig.to_html(full_html=False, include_plotlyjs=False)
         
         # 6. Content Structure Analysis
         if self.notes:
@@ -580,22 +717,19 @@ class NotesAnalyzer:
                     showlegend=False
                 )
                 
-                charts['structure'] = pyo.plot(fig, output_type='div', include_plotlyjs=False)
+                charts['structure'] = fig.to_html(full_html=False, include_plotlyjs=False)
         
         # 7. Note Length Distribution (Enhanced)
         if self.notes:
-            word_counts = [n.word_count for n in self.notes if n.word_count > 0]
-            if word_counts:
-                # Create bins for different note types
-                very_short = len([w for w in word_counts if w < 20])
-                short = len([w for w in word_counts if 20 <= w < 100])
-                medium = len([w for w in word_counts if 100 <= w < 500])
-                long_notes = len([w for w in word_counts if 500 <= w < 2000])
-                very_long = len([w for w in word_counts if w >= 2000])
+            word_counts = np.fromiter((n.word_count for n in self.notes), dtype=np.int64, count=len(self.notes))
+            word_counts = word_counts[word_counts > 0]
+            if word_counts.size:
+                # Bin into the note types in one numpy pass instead of five list scans
+                bin_edges = [0, 20, 100, 500, 2000, max(2000, int(word_counts.max())) + 1]
+                counts = np.histogram(word_counts, bins=bin_edges)[0].tolist()
                 
                 categories = ['Very Short<br>(0-19)', 'Short<br>(20-99)', 'Medium<br>(100-499)', 
                              'Long<br>(500-1999)', 'Very Long<br>(2000+)']
-                counts = [very_short, short, medium, long_notes, very_long]
                 colors = ['#e74c3c', '#f39c12', '#f1c40f', '#2ecc71', '#3498db']
                 
                 fig = go.Figure()
@@ -618,7 +752,7 @@ class NotesAnalyzer:
                     showlegend=False
                 )
                 
-                charts['smart_word_dist'] = pyo.plot(fig, output_type='div', include_plotlyjs=False)
+                charts['smart_word_dist'] = fig.to_html(full_html=False, include_plotlyjs=False)
         
         # 8. Top connected notes (Enhanced)
         if self.stats['most_linked']:
@@ -642,14 +776,12 @@ class NotesAnalyzer:
                 yaxis={'categoryorder': 'total ascending'}
             )
             
-            charts['top_linked'] = pyo.plot(fig, output_type='div', include_plotlyjs=False)
+            charts['top_linked'] = fig.to_html(full_html=False, include_plotlyjs=False)
         
         # 9. INNOVATIVE: Note Creation Momentum Analysis
         if self.notes:
-            dates_and_notes = [(n.created, n) for n in self.notes if n.created]
+            dates_and_notes = [(n.created, n) for n in created_notes]
             if len(dates_and_notes) > 10:  # Need enough data
-                dates_and_notes.sort(key=lambda x: x[0])
-                
                 # Calculate time gaps between notes
                 time_gaps = []
                 for i in range(1, len(dates_and_notes)):
@@ -695,30 +827,13 @@ class NotesAnalyzer:
                     height=400
                 )
                 
-                charts['momentum'] = pyo.plot(fig, output_type='div', include_plotlyjs=False)
+                charts['momentum'] = fig.to_html(full_html=False, include_plotlyjs=False)
         
         # 10. ULTRA-NERDY: Seasonal and Cyclical Patterns
         if self.notes:
-            dates_with_data = [(n.created, n) for n in self.notes if n.created]
-            if len(dates_with_data) > 30:  # Need substantial data
-                # Extract temporal features
-                temporal_data = []
-                for dt, note in dates_with_data:
-                    temporal_data.append({
-                        'month': dt.month,
-                        'day_of_week': dt.weekday(),
-                        'hour': dt.hour,
-                        'quarter': (dt.month - 1) // 3 + 1,
-                        'season': ['Winter', 'Winter', 'Spring', 'Spring', 'Spring', 
-                                  'Summer', 'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'][dt.month - 1],
-                        'word_count': note.word_count
-                    })
-                
-                # Create seasonal analysis
-                seasonal_counts = Counter(item['season'] for item in temporal_data)
-                seasonal_words = defaultdict(list)
-                for item in temporal_data:
-                    seasonal_words[item['season']].append(item['word_count'])
+            if len(created_notes) > 30:  # Need substantial data
+                seasonal_counts = {season: len(words) for season, words in season_word_counts.items()}
+                seasonal_words = season_word_counts
                 
                 seasons = ['Spring', 'Summer', 'Fall', 'Winter']
                 counts = [seasonal_counts.get(s, 0) for s in seasons]
@@ -753,7 +868,7 @@ class NotesAnalyzer:
                     showlegend=False
                 )
                 
-                charts['seasonal'] = pyo.plot(fig, output_type='div', include_plotlyjs=False)
+                charts['seasonal'] = fig.to_html(full_html=False, include_plotlyjs=False)
         
         # 11. SUPER NERDY: Link Network Centrality Analysis
         if self.notes:
@@ -770,16 +885,14 @@ class NotesAnalyzer:
             if len(link_network) > 5:
                 # Calculate centrality metrics
                 centrality_scores = {}
-                for note_title in link_network:
+                for note_title, neighbours in link_network.items():
                     # Simple degree centrality
-                    degree = len(link_network[note_title])
+                    degree = len(neighbours)
                     
-                    # Calculate "influence" (2nd degree connections)
-                    second_degree = set()
-                    for connected_note in link_network[note_title]:
-                        second_degree.update(link_network.get(connected_note, set()))
-                    second_degree.discard(note_title)  # Remove self
-                    influence = len(second_degree)
+                    # Calculate "influence" (2nd degree connections). Links are stored both
+                    # ways, so every neighbour has an entry and one C-level union covers them.
+                    second_degree = set().union(*[link_network[c] for c in neighbours])
+                    influence = len(second_degree) - (note_title in second_degree)  # Minus self
                     
                     centrality_scores[note_title] = {
                         'degree': degree,
@@ -787,9 +900,9 @@ class NotesAnalyzer:
                         'total_score': degree * 2 + influence
                     }
                 
-                # Get top influential notes
-                top_influential = sorted(centrality_scores.items(), 
-                                       key=lambda x: x[1]['total_score'], reverse=True)[:10]
+                # Get top influential notes (nlargest keeps sorted()'s order on ties)
+                top_influential = heapq.nlargest(10, centrality_scores.items(),
+                                                 key=lambda x: x[1]['total_score'])
                 
                 if top_influential:
                     titles = [item[0][:30] + '...' if len(item[0]) > 30 else item[0] 
@@ -814,12 +927,13 @@ class NotesAnalyzer:
                         yaxis={'categoryorder': 'total ascending'}
                     )
                     
-                    charts['network_centrality'] = pyo.plot(fig, output_type='div', include_plotlyjs=False)
+                    charts['network_centrality'] = fig.to_html(full_html=False, include_plotlyjs=False)
         
         return charts
     
     def generate_word_cloud(self) -> str:
         """Generate a word cloud from note titles and content"""
+        _load_chart_libraries()
         try:
             # Combine all titles and extract words
             all_text = []
@@ -839,8 +953,8 @@ class NotesAnalyzer:
             text = ' '.join(all_text)
             
             # Remove common words and clean
-            text = re.sub(r'\b(the|and|or|but|in|on|at|to|for|of|with|by|a|an)\b', '', text, flags=re.IGNORECASE)
-            text = re.sub(r'[^\w\s]', '', text)
+            text = WORD_CLOUD_STOPWORD_PATTERN.sub('', text)
+            text = WORD_CLOUD_PUNCTUATION_PATTERN.sub('', text)
             
             if len(text.strip()) < 10:
                 return ""
@@ -859,17 +973,12 @@ class NotesAnalyzer:
             import io
             import base64
             
-            plt.figure(figsize=(12, 6))
-            plt.imshow(wordcloud, interpolation='bilinear')
-            plt.axis('off')
-            plt.title('Most Common Topics and Titles', fontsize=16, pad=20)
-            
+            # The word cloud is already an 800x400 raster and the section has its own heading,
+            # so save its PIL image directly instead of redrawing it through a pyplot figure
             buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', bbox_inches='tight', dpi=150)
-            buffer.seek(0)
+            wordcloud.to_image().save(buffer, format='PNG')
             
             img_base64 = base64.b64encode(buffer.getvalue()).decode()
-            plt.close()
             
             return f'<img src="data:image/png;base64,{img_base64}" style="width: 100%; max-width: 800px;">'
             
@@ -893,7 +1002,7 @@ class NotesAnalyzer:
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>KeepVault Analytics Dashboard</title>
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
+    <script src="https://cdn.plot.ly/plotly-cartesian-2.35.2.min.js"></script>
     <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
     <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
     <style>
@@ -1184,24 +1293,23 @@ class NotesAnalyzer:
             length_assessment = "You write comprehensive notes!"
         
         # Calculate additional advanced metrics
-        notes_with_dates = [n for n in self.notes if n.created]
-        if notes_with_dates:
-            # Writing frequency analysis
-            dates = [n.created.date() for n in notes_with_dates]
+        created_dates = [n.created for n in self.notes if n.created]
+        if created_dates:
+            # Writing frequency analysis; only the distinct days are needed
+            dates = {dt.date() for dt in created_dates}
             date_range = (max(dates) - min(dates)).days
             if date_range > 0:
-                notes_per_day = len(notes_with_dates) / date_range
+                notes_per_day = len(created_dates) / date_range
                 frequency_assessment = f"{notes_per_day:.2f} notes/day"
             else:
                 frequency_assessment = "All notes created on same day"
             
             # Productivity streaks
-            date_counts = Counter(dates)
-            active_days = len(date_counts)
+            active_days = len(dates)
             productivity_rate = (active_days / date_range * 100) if date_range > 0 else 100
             
-            # Link density
-            total_links = sum(len(n.internal_links) for n in self.notes)
+            # Link density (already summed by calculate_statistics)
+            total_links = stats['content']['total_internal_links']
             if len(self.notes) > 0:
                 link_density = total_links / len(self.notes)
                 if link_density < 1:
@@ -1219,7 +1327,7 @@ class NotesAnalyzer:
         
         # Most popular color
         if stats['colors']:
-            popular_color = max(stats['colors'], key=stats['colors'].get)
+            popular_color = max(stats['colors'].items(), key=itemgetter(1))[0]
         else:
             popular_color = "White"
         
@@ -1270,7 +1378,6 @@ class NotesAnalyzer:
             timeline_chart=charts.get('timeline', '<p>No timeline data available</p>'),
             colors_chart=charts.get('colors', '<p>No color data available</p>'),
             creation_patterns_chart=charts.get('creation_patterns', '<p>No creation pattern data available</p>'),
-            word_dist_chart=charts.get('word_dist', '<p>No word count data available</p>'),
             smart_word_dist_chart=charts.get('smart_word_dist', '<p>No smart word distribution data available</p>'),
             heatmap_chart=charts.get('heatmap', '<p>No activity data available</p>'),
             momentum_chart=charts.get('momentum', '<p>No momentum data available</p>'),
@@ -1311,8 +1418,8 @@ def main():
     # Initialize analyzer
     analyzer = NotesAnalyzer(vault_path)
     
-    # Scan and analyze
-    analyzer.scan_vault()
+    # Scan and analyze, reusing notes unchanged since the last run
+    analyzer.scan_vault(Path(args.output).with_name(ANALYSIS_CACHE_NAME))
     
     if not analyzer.notes:
         print("No notes found in the vault!")
@@ -1,6 +1,9 @@
 import os
 import sys
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # Reads and rewrites are I/O bound and release the GIL
 
 
 def split_frontmatter_and_body(text: str):
@@ -25,12 +28,24 @@ def remove_id_from_yaml(yaml_str: str) -> str:
     return '\n'.join(kept)
 
 
-def process_markdown_file(path: str) -> bool:
+def read_note_with_frontmatter(path: str):
+    """Return the note's text as text mode would read it, or None if it cannot start with
+    a frontmatter fence. Only four bytes are read from notes without one."""
+    with open(path, 'rb') as f:
+        head = f.read(4)
+        if head[:3] != b'---' or head[3:4] not in (b'\n', b'\r'):
+            return None
+        raw = head + f.read()
+    return raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def process_markdown_file(path: str, dry_run: bool = False) -> bool:
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            original = f.read()
+        original = read_note_with_frontmatter(path)
     except Exception:
         return False
+    if original is None:
+        return False
 
     yaml_str, body = split_frontmatter_and_body(original)
     if yaml_str is None:
@@ -40,9 +55,10 @@ def process_markdown_file(path: str) -> bool:
     if new_yaml == yaml_str:
         return False
 
-    new_content = f"---\n{new_yaml}\n---\n{body}"
-    with open(path, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+    if not dry_run:
+        new_content = f"---\n{new_yaml}\n---\n{body}"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(new_content)
     return True
 
 
@@ -64,26 +80,17 @@ def main():
         print(f"Root not found: {root}")
         return 2
 
-    total = 0
-    changed = 0
-    for md in iter_markdown_files(root):
-        total += 1
+    def process_one(md: str) -> bool:
         try:
-            with open(md, 'r', encoding='utf-8') as f:
-                content = f.read()
-            yaml_str, _body = split_frontmatter_and_body(content)
-            if yaml_str is None:
-                continue
-            new_yaml = remove_id_from_yaml(yaml_str)
-            if new_yaml != yaml_str:
-                changed += 1
-                if not args.dry_run:
-                    new_content = f"---\n{new_yaml}\n---\n{content[ content.find('\n---\n', 4) + 5: ]}"
-                    with open(md, 'w', encoding='utf-8') as fw:
-                        fw.write(new_content)
+            return process_markdown_file(md, dry_run=args.dry_run)
         except Exception:
-            # skip unreadable files
-            continue
+            # skip unwritable files
+            return False
+
+    paths = list(iter_markdown_files(root))
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        changed = sum(executor.map(process_one, paths))
+    total = len(paths)
 
     print(f"Scanned {total} Markdown files under {root}. Updated {changed}.")
     return 0
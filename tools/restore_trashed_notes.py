@@ -2,74 +2,140 @@
 """
 Script to restore trashed notes interactively.
 Goes through all notes with trashed: true and prompts user to restore them.
+With --yes they are all restored in one batch, and --dry-run only lists them.
 """
 
+import argparse
+import fnmatch
 import os
 import re
-import glob
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def find_trashed_notes(vault_path="KeepVault"):
-    """Find all markdown files with trashed: true in their YAML front matter."""
-    trashed_notes = []
-    
-    # Search in both main KeepVault directory and Trashed subdirectory
-    patterns = [
-        os.path.join(vault_path, "*.md"),
-        os.path.join(vault_path, "**", "*.md")
-    ]
+# Front matter patterns, compiled once instead of per note
+TRASHED_TRUE_PATTERN = re.compile(r'^trashed:\s*true\s*$', re.MULTILINE)
+TITLE_PATTERN = re.compile(r'^title:\s*(.+)$', re.MULTILINE)
+HEAD_READ_SIZE = 16384  # Front matter normally fits in the first chunk of a note
+MAX_READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # File reads are I/O bound and release the GIL
+
+def iter_markdown_files(root):
+    """Yield .md paths under root lazily, skipping hidden entries like glob's '**' does."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for name in filenames:
+            if name.endswith('.md') and not name.startswith('.'):
+                yield os.path.join(dirpath, name)
+
+def front_matter_end(content):
+    """Return the index just past the '---' closing the note's front matter, or -1 if the
+    note does not open with '---' or it is never closed."""
+    if not content.startswith('---'):
+        return -1
+    yaml_end = content.find('---', 3)
+    return yaml_end + 3 if yaml_end != -1 else -1
+
+def read_note_head(file_path):
+    """Return (content, yaml_end, complete) for a note with front matter, or None if it has
+    none. content holds the note's text at least through the '---' closing its front matter,
+    which ends at yaml_end, and complete tells whether it is the whole note. The body is only
+    read when the front matter runs past the first chunk."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read(HEAD_READ_SIZE)
+        if not content.startswith('---'):
+            return None
+        complete = len(content) < HEAD_READ_SIZE  # A short read means the end of the file
+        yaml_end = front_matter_end(content)
+        if yaml_end == -1:
+            content += f.read()
+            complete = True
+            yaml_end = front_matter_end(content)
+            if yaml_end == -1:
+                return None
+    return content, yaml_end, complete
+
+def read_note(file_path):
+    """Return a note's full text, read as bytes and decoded in one go (newlines as text mode gives them)."""
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    return raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+def scan_trashed_note(file_path):
+    """Return a note's (title, preview) if its YAML front matter has trashed: true, else None."""
+    try:
+        head = read_note_head(file_path)
+        if head is None:
+            return None
+        content, yaml_end, complete = head
+        yaml_section = content[:yaml_end]
+        # Synced notes all carry 'trashed: false', so it is the missing 'true' that rejects
+        # most of them before the regex runs
+        if 'true' not in yaml_section or not TRASHED_TRUE_PATTERN.search(yaml_section):
+            return None
+    except Exception as e:
+        print(f"Error reading {file_path}: {e}")
+        return None
     
-    for pattern in patterns:
-        for file_path in glob.glob(pattern, recursive=True):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    
-                # Check if file has YAML front matter with trashed: true
-                if content.startswith('---'):
-                    yaml_end = content.find('---', 3)
-                    if yaml_end != -1:
-                        yaml_section = content[:yaml_end + 3]
-                        if re.search(r'^trashed:\s*true\s*$', yaml_section, re.MULTILINE):
-                            trashed_notes.append(file_path)
-                            
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}")
-                
-    return trashed_notes
+    # A note that fit in the first chunk has been read whole already; only longer ones are read again
+    return note_header(content, file_path) if complete else get_note_header(file_path)
 
-def get_note_title(file_path):
-    """Extract the title from a note's YAML front matter."""
+def find_trashed_notes(vault_path="KeepVault"):
+    """Find all markdown files with trashed: true in their YAML front matter.
+    Returns (path, title, preview) for each, so they need not be read again to be shown."""
+    # Single walk over the main KeepVault directory and its subdirectories (incl. Trashed);
+    # the reads overlap on a thread pool and map keeps the walk order
+    file_paths = list(iter_markdown_files(vault_path))
+    with ThreadPoolExecutor(max_workers=MAX_READ_WORKERS) as executor:
+        return [(path,) + header for path, header in zip(file_paths, executor.map(scan_trashed_note, file_paths))
+                if header is not None]
+
+def get_note_header(file_path):
+    """Return a note's title and a short preview of its body, from a single read of the file."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        if content.startswith('---'):
-            yaml_end = content.find('---', 3)
-            if yaml_end != -1:
-                yaml_section = content[:yaml_end]
-                title_match = re.search(r'^title:\s*(.+)$', yaml_section, re.MULTILINE)
-                if title_match:
-                    return title_match.group(1).strip()
-                    
-        # Fallback to filename
-        return Path(file_path).stem
-        
+        content = read_note(file_path)
     except Exception:
-        return Path(file_path).stem
+        return Path(file_path).stem, ''
+    return note_header(content, file_path)
+
+def note_header(content, file_path):
+    """Return a note's title (its YAML title, else the filename) and a short preview of its body."""
+    title = Path(file_path).stem  # Fallback to filename
+    yaml_end = front_matter_end(content)
+    if yaml_end != -1:
+        title_match = TITLE_PATTERN.search(content[:yaml_end - 3])
+        if title_match:
+            title = title_match.group(1).strip()
+    
+    # Skip YAML front matter and show first few lines of content
+    lines = content.split('\n')
+    content_start = 0
+    for j, line in enumerate(lines):
+        if line.strip() == '---' and j > 0:
+            content_start = j + 1
+            break
+    preview = ' '.join(line.strip() for line in lines[content_start:content_start + 3] if line.strip())
+    return title, preview
+
+def untrash_note(file_path):
+    """Change trashed: true to trashed: false in the file's front matter. Raises on read/write
+    errors or when the note has no front matter."""
+    content = read_note(file_path)
+    yaml_end = front_matter_end(content)
+    if yaml_end == -1:
+        raise ValueError("no YAML front matter")
+        
+    # Replace trashed: true with trashed: false, in the same front matter scan_trashed_note
+    # looked at; the body is written back as read
+    header, replaced = TRASHED_TRUE_PATTERN.subn('trashed: false', content[:yaml_end])
+    if not replaced:
+        return
+    
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(header + content[yaml_end:])
 
 def restore_note(file_path):
-    """Change trashed: true to trashed: false in the file."""
+    """Change trashed: true to trashed: false in the file, reporting the outcome."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Replace trashed: true with trashed: false
-        updated_content = re.sub(r'^trashed:\s*true\s*$', 'trashed: false', content, flags=re.MULTILINE)
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(updated_content)
-            
+        untrash_note(file_path)
         print(f"✅ Restored: {file_path}")
         return True
         
@@ -77,9 +143,38 @@ def restore_note(file_path):
         print(f"❌ Error restoring {file_path}: {e}")
         return False
 
+def restore_notes_batch(file_paths):
+    """Restore every note without prompting, on a thread pool. Returns how many were restored."""
+    def try_untrash(file_path):
+        try:
+            untrash_note(file_path)
+            return None
+        except Exception as e:
+            return e
+    
+    # Each restore is an independent read-modify-write; results are reported here, in order,
+    # so lines from different workers never interleave
+    restored_count = 0
+    with ThreadPoolExecutor(max_workers=MAX_READ_WORKERS) as executor:
+        for file_path, error in zip(file_paths, executor.map(try_untrash, file_paths)):
+            if error is None:
+                print(f"✅ Restored: {file_path}")
+                restored_count += 1
+            else:
+                print(f"❌ Error restoring {file_path}: {error}")
+    return restored_count
+
 def main():
+    parser = argparse.ArgumentParser(description="Restore trashed notes, asking about each one by default")
+    parser.add_argument('--yes', '-y', action='store_true', help='Restore every trashed note without asking')
+    parser.add_argument('--dry-run', action='store_true', help='Only list the trashed notes, change nothing')
+    parser.add_argument('--pattern', help="Only consider notes whose file name matches this glob, e.g. 'Recipe*'")
+    args = parser.parse_args()
+    
     print("🗂️  Finding trashed notes...")
     trashed_notes = find_trashed_notes()
+    if args.pattern:
+        trashed_notes = [note for note in trashed_notes if fnmatch.fnmatch(os.path.basename(note[0]), args.pattern)]
     
     if not trashed_notes:
         print("📭 No trashed notes found!")
@@ -87,38 +182,32 @@ def main():
         
     print(f"📋 Found {len(trashed_notes)} trashed notes\n")
     
+    cwd = os.getcwd()  # relpath() would ask for it again for every note
+    
+    if args.dry_run:
+        for i, (file_path, title, _) in enumerate(trashed_notes, 1):
+            print(f"[{i}/{len(trashed_notes)}] 📝 {title}")
+            print(f"    📁 {os.path.relpath(file_path, cwd)}")
+        print(f"\n🔍 Dry run: {len(trashed_notes)} notes would be restored.")
+        return
+    
+    if args.yes:
+        restored_count = restore_notes_batch([file_path for file_path, _, _ in trashed_notes])
+        print(f"\n✨ Done! Restored {restored_count} notes, skipped 0 notes.")
+        return
+    
     restored_count = 0
     skipped_count = 0
     
-    for i, file_path in enumerate(trashed_notes, 1):
-        title = get_note_title(file_path)
-        relative_path = os.path.relpath(file_path)
+    for i, (file_path, title, preview) in enumerate(trashed_notes, 1):
+        relative_path = os.path.relpath(file_path, cwd)
         
         print(f"[{i}/{len(trashed_notes)}] 📝 {title}")
         print(f"    📁 {relative_path}")
         
         # Show a preview of the content
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                
-            # Skip YAML front matter and show first few lines of content
-            content_start = 0
-            for j, line in enumerate(lines):
-                if line.strip() == '---' and j > 0:
-                    content_start = j + 1
-                    break
-                    
-            preview_lines = []
-            for j in range(content_start, min(content_start + 3, len(lines))):
-                if j < len(lines) and lines[j].strip():
-                    preview_lines.append(lines[j].strip())
-                    
-            if preview_lines:
-                print(f"    💬 Preview: {' '.join(preview_lines)[:100]}...")
-                
-        except Exception:
-            pass
+        if preview:
+            print(f"    💬 Preview: {preview[:100]}...")
             
         # Prompt user with default 'y'
         while True:
@@ -1,16 +1,28 @@
 import os
 import re
 
+# Compiled once instead of per file
+FRONTMATTER_TAGS_PATTERN = re.compile(r"^---.*?tags:.*?---", re.DOTALL | re.IGNORECASE)
+INLINE_TAG_PATTERN = re.compile(r"#\w+")
+HEAD_READ_SIZE = 16384  # Front matter and most tags fall in the first chunk of a note
+
 def has_tags(filepath):
     """Checks if a markdown file contains tags."""
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+            # Most tagged notes show it in their head, so check that before reading the rest
+            content = f.read(HEAD_READ_SIZE)
+            if FRONTMATTER_TAGS_PATTERN.search(content) or INLINE_TAG_PATTERN.search(content):
+                return True
+            rest = f.read()
+            if not rest:
+                return False
+            content += rest
             # Check for tags in frontmatter (e.g., tags: [tag1, tag2])
-            if re.search(r"^---.*?tags:.*?---", content, re.DOTALL | re.IGNORECASE):
+            if FRONTMATTER_TAGS_PATTERN.search(content):
                 return True
             # Check for inline tags (e.g., #tag)
-            if re.search(r"#\w+", content):
+            if INLINE_TAG_PATTERN.search(content):
                 return True
     except Exception as e:
         print(f"Error reading file {filepath}: {e}")
@@ -10,8 +10,30 @@ import re
 import yaml
 import glob
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
+# Prefer the libyaml-backed loader/dumper when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
+# Inline #tag, not inside code spans, URLs or longer words; compiled once instead of per note
+INLINE_TAG_PATTERN = re.compile(r'(?<![`#\w])(#[a-zA-Z0-9_-]+)')
+MAX_READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # File reads are I/O bound and release the GIL
+# Top-level 'key: value' frontmatter line; the value comes without surrounding blanks
+FRONTMATTER_KEY_PATTERN = re.compile(r'([\w-]+):(?:[ \t]+(.*?))?[ \t]*')
+# Single-line quoted or flow values, which are the only ones that could run on into the next key
+QUOTED_VALUE_PATTERN = re.compile(r'''(?:'(?:[^']|'')*'|"(?:[^"\\]|\\.)*")(?:[ \t]+#.*)?''')
+FLOW_VALUE_PATTERN = re.compile(r'''\[[^\[\]{}'"]*\]|\{[^\[\]{}'"]*\}''')
+# '- tag' item of a block list
+TAG_ITEM_PATTERN = re.compile(r'([ \t]*)-[ \t]+(.*?)[ \t]*')
+# Tag names YAML reads back as the same plain string: a letter or '_' then tag characters,
+# minus the words YAML would read as booleans or null
+PLAIN_TAG_PATTERN = re.compile(r'[^\W\d][\w/-]*')
+YAML_RESERVED_WORDS = {'yes', 'no', 'y', 'n', 'true', 'false', 'on', 'off', 'null'}
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,10 +45,111 @@ console = logging.StreamHandler()
 console.setLevel(logging.INFO)
 logging.getLogger('').addHandler(console)
 
+def _read_note(file_path):
+    """Read a note in one binary read, decoded and with newlines translated as text mode would."""
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    return raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+def _split_frontmatter(content):
+    """
+    Locate a note's YAML frontmatter, the text between its opening '---' and the next '---'.
+    Returns (frontmatter, start, end): that text without surrounding blanks, where it starts
+    in content and where the closing '---' is; or (None, 0, 0) when there is none.
+    """
+    if content.startswith('---'):
+        end = content.find('---', 3)
+        if end != -1:
+            raw = content[3:end]
+            frontmatter = raw.strip()
+            return frontmatter, 3 + len(raw) - len(raw.lstrip()), end
+    return None, 0, 0
+
+def _is_plain_tag(tag):
+    return bool(PLAIN_TAG_PATTERN.fullmatch(tag)) and tag.lower() not in YAML_RESERVED_WORDS
+
+def _is_simple_value(value):
+    """Whether a top-level value surely ends on its own line (it may still be nested below)."""
+    if value[0] in '\'"':
+        return bool(QUOTED_VALUE_PATTERN.fullmatch(value))
+    if value[0] in '[{':
+        return bool(FLOW_VALUE_PATTERN.fullmatch(value))
+    return value[0] not in '&*!%@`?|>' and ': ' not in value and not value.endswith(':')
+
+def _parse_tags_field(frontmatter):
+    """
+    Read the 'tags' field of simple frontmatter without a YAML parser.
+    Returns (tags, start, end, style): tags as YAML would load them (a list, a string or
+    None), the span of the field's lines in frontmatter and its style, 'block' ('tags:'
+    then '- tag' lines), 'flow' ('tags: [a, b]') or 'scalar' ('tags: a, b'), or None when
+    there is no 'tags' field. Returns None when the frontmatter is not simple
+    enough to be sure, and the caller should load it with YAML instead.
+    """
+    if 'tags' not in frontmatter:
+        return None, 0, 0, None
+    if '\r' in frontmatter:
+        return None
+    
+    def field_ends(index):
+        # A following blank, comment, indented or '-' line could still belong to the field
+        return index == len(lines) or lines[index][:1] not in ('', ' ', '\t', '#', '-')
+    
+    lines = frontmatter.split('\n')
+    field = None
+    list_pending = False  # The previous key had no value, so '- item' lines may follow
+    position = 0
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        line_start = position
+        position += len(line) + 1
+        index += 1
+        if not line or line[0] in ' \t#':
+            continue
+        match = FRONTMATTER_KEY_PATTERN.fullmatch(line)
+        if not match:
+            if line[0] == '-' and list_pending:
+                continue
+            return None
+        key, value = match.groups()
+        list_pending = not value
+        if key != 'tags':
+            if value and not _is_simple_value(value):
+                return None
+            continue
+        if field is not None:
+            return None  # Duplicate key, YAML keeps the last one
+        
+        if not value:
+            tags, indent = [], None
+            while index < len(lines):
+                item = TAG_ITEM_PATTERN.fullmatch(lines[index])
+                if not item or not _is_plain_tag(item.group(2)) or indent not in (None, item.group(1)):
+                    break
+                indent = item.group(1)
+                tags.append(item.group(2))
+                position += len(lines[index]) + 1
+                index += 1
+            field = (tags or None, 'block')
+        elif value[0] == '[' and value[-1] == ']':
+            tags = [tag.strip() for tag in value[1:-1].split(',')] if value[1:-1].strip() else []
+            if not all(map(_is_plain_tag, tags)):
+                return None
+            field = (tags, 'flow')
+        else:
+            if not all(_is_plain_tag(tag.strip()) for tag in value.split(',')):
+                return None
+            field = (value, 'scalar')
+        if not field_ends(index):
+            return None
+        field = (field[0], line_start, min(position, len(frontmatter)), field[1])
+    
+    return field or (None, 0, 0, None)
+
 class ObsidianVaultCleaner:
     def __init__(self, vault_path="KeepVault"):
         self.vault_path = vault_path
-        self.tag_usage = defaultdict(list)
+        self.tag_usage = {}  # tag -> the only file using it, or None once a second file does
         self.single_use_tags = set()
         self.total_tags_before = 0
         self.total_tags_after = 0
@@ -44,13 +167,16 @@ class ObsidianVaultCleaner:
         
         logging.info(f"Found {len(markdown_files)} markdown files")
         
-        # Process each file to extract tags
-        for file_path in markdown_files:
-            self._process_file_tags(file_path)
+        # Extract tags on a thread pool; usage is recorded here in file order (map keeps it).
+        # Only whether a second file uses a tag matters, so no per-tag file lists are kept
+        with ThreadPoolExecutor(max_workers=MAX_READ_WORKERS) as executor:
+            for file_path, tags in zip(markdown_files, executor.map(self._process_file_tags, markdown_files)):
+                for tag in tags:
+                    self.tag_usage[tag] = None if tag in self.tag_usage else file_path
         
         # Identify tags used only once
-        for tag, files in self.tag_usage.items():
-            if len(files) == 1:
+        for tag, file_path in self.tag_usage.items():
+            if file_path is not None:
                 self.single_use_tags.add(tag)
         
         self.total_tags_before = len(self.tag_usage)
@@ -61,19 +187,24 @@ class ObsidianVaultCleaner:
         logging.info(f"Single-use tags: {', '.join(sorted(self.single_use_tags))}")
 
     def _process_file_tags(self, file_path):
-        """Extract tags from a markdown file (both YAML frontmatter and inline tags)."""
+        """Return the tags of a markdown file (both YAML frontmatter and inline tags)."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = _read_note(file_path)
             
             # Extract tags from YAML frontmatter
             frontmatter_tags = []
-            if content.startswith('---'):
-                frontmatter_end = content.find('---', 3)
-                if frontmatter_end != -1:
-                    frontmatter = content[3:frontmatter_end].strip()
+            frontmatter = _split_frontmatter(content)[0]
+            if frontmatter is not None:
+                field = _parse_tags_field(frontmatter)
+                if field is not None:
+                    tags = field[0]
+                    if isinstance(tags, list):
+                        frontmatter_tags = tags
+                    elif isinstance(tags, str):
+                        frontmatter_tags = [tag.strip() for tag in tags.split(',')]
+                else:
                     try:
-                        metadata = yaml.safe_load(frontmatter)
+                        metadata = yaml.load(frontmatter, Loader=_YamlLoader)
                         if metadata and 'tags' in metadata:
                             if isinstance(metadata['tags'], list):
                                 frontmatter_tags = metadata['tags']
@@ -83,20 +214,20 @@ class ObsidianVaultCleaner:
                     except yaml.YAMLError:
                         logging.warning(f"Error parsing YAML frontmatter in {file_path}")
             
-            # Extract inline tags using regex
-            # Match #tag patterns but not within code blocks, URLs, or other special contexts
-            inline_tags = re.findall(r'(?<![`#\w])(#[a-zA-Z0-9_-]+)', content)
-            inline_tags = [tag[1:] for tag in inline_tags]  # Remove the # prefix
-            
             # Combine all tags found in the file
-            all_tags = set(frontmatter_tags + inline_tags)
+            tags = set(frontmatter_tags)
             
-            # Record which file each tag appears in
-            for tag in all_tags:
-                self.tag_usage[tag].append(file_path)
+            # Extract inline tags using regex, without the # prefix, straight into the set
+            # Match #tag patterns but not within code blocks, URLs, or other special contexts.
+            # The leading look-behind keeps the regex engine from skipping ahead to a '#', so
+            # notes without any are rejected by a plain substring test first
+            if '#' in content:
+                tags.update(match.group(1)[1:] for match in INLINE_TAG_PATTERN.finditer(content))
+            return tags
                 
         except Exception as e:
             logging.error(f"Error processing {file_path}: {str(e)}")
+            return set()
 
     def remove_single_use_tags(self):
         """Remove tags that are only used once from their respective files."""
@@ -106,69 +237,140 @@ class ObsidianVaultCleaner:
         
         modified_files = 0
         
+        # Group the tags by file so each file is read and written once, however many go
+        tags_by_file = defaultdict(list)
         for tag in self.single_use_tags:
-            if tag in self.tag_usage and len(self.tag_usage[tag]) == 1:
-                file_path = self.tag_usage[tag][0]
-                self._remove_tag_from_file(tag, file_path)
+            if self.tag_usage.get(tag) is not None:
+                tags_by_file[self.tag_usage[tag]].append(tag)
                 modified_files += 1
         
+        for file_path, tags in tags_by_file.items():
+            self._remove_tags_from_file(tags, file_path)
+        
         logging.info(f"Modified {modified_files} files to remove single-use tags")
 
-    def _remove_tag_from_file(self, tag, file_path):
-        """Remove a specific tag from a file."""
+    def _remove_tags_from_file(self, tags, file_path):
+        """Remove tags from a file in memory, with a single read and write."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            modified = False
-            
-            # Handle tags in YAML frontmatter
-            if content.startswith('---'):
-                frontmatter_end = content.find('---', 3)
-                if frontmatter_end != -1:
-                    frontmatter = content[3:frontmatter_end].strip()
-                    try:
-                        metadata = yaml.safe_load(frontmatter)
-                        if metadata and 'tags' in metadata:
-                            if isinstance(metadata['tags'], list) and tag in metadata['tags']:
-                                metadata['tags'].remove(tag)
-                                modified = True
-                                # If tags list is now empty, remove the tags field
-                                if not metadata['tags']:
-                                    del metadata['tags']
-                            elif isinstance(metadata['tags'], str):
-                                tag_list = [t.strip() for t in metadata['tags'].split(',')]
-                                if tag in tag_list:
-                                    tag_list.remove(tag)
-                                    metadata['tags'] = ', '.join(tag_list) if tag_list else None
-                                    if metadata['tags'] is None:
-                                        del metadata['tags']
-                                    modified = True
-                        
-                        # Rebuild the frontmatter
-                        if modified:
-                            new_frontmatter = yaml.dump(metadata, default_flow_style=False, sort_keys=False)
-                            new_content = f"---\n{new_frontmatter}---\n{content[frontmatter_end+3:]}"
-                            content = new_content
-                    except yaml.YAMLError:
-                        logging.warning(f"Error parsing YAML frontmatter in {file_path}")
+            content = original = _read_note(file_path)
+        except Exception as e:
+            for tag in tags:
+                logging.error(f"Error removing tag '{tag}' from {file_path}: {str(e)}")
+            return
+        
+        escaped_tags = {}
+        modified_tags = set()
+        for tag in tags:
+            try:
+                escaped_tags[tag] = re.escape(tag)
+                content, modified = self._remove_tag_from_frontmatter(tag, content, file_path)
+            except Exception as e:
+                escaped_tags.pop(tag, None)
+                logging.error(f"Error removing tag '{tag}' from {file_path}: {str(e)}")
+                continue
+            if modified:
+                modified_tags.add(tag)
+        
+        # Handle inline tags of every tag in one pass; longer tags first so '#a-b' wins over '#a'.
+        # Dropping a tag glued to the next one ('#a#b') exposes that one, so go again then.
+        if escaped_tags and '#' in content:
+            joined = '|'.join(escaped_tags[tag] for tag in sorted(escaped_tags, key=len, reverse=True))
+            tags_pattern = re.compile(r'(?<![`#\w])#(' + joined + r')(?!\w)')
+            rescan = True
             
-            # Handle inline tags
-            tag_pattern = r'(?<![`#\w])(#' + re.escape(tag) + r')(?!\w)'
-            if re.search(tag_pattern, content):
-                content = re.sub(tag_pattern, '', content)
-                modified = True
+            def drop_tag(match):
+                nonlocal rescan
+                modified_tags.add(match.group(1))
+                rescan = rescan or match.string.startswith('#', match.end())
+                return ''
             
-            # Write back to the file if modified
-            if modified:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                logging.info(f"Removed tag '{tag}' from {file_path}")
+            while rescan:
+                rescan = False
+                content = tags_pattern.sub(drop_tag, content)
+        
+        removed = []
+        for tag in escaped_tags:
+            if tag in modified_tags:
+                removed.append(tag)
             else:
                 logging.warning(f"Failed to locate tag '{tag}' in {file_path} for removal")
+        
+        # Write back to the file if modified, through a temp file so a failed write cannot truncate the note
+        if removed:
+            try:
+                if content != original:
+                    tmp_path = file_path + '.tmp'
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        f.write(content)
+                    os.replace(tmp_path, file_path)
+            except Exception as e:
+                for tag in removed:
+                    logging.error(f"Error removing tag '{tag}' from {file_path}: {str(e)}")
+                return
+            for tag in removed:
+                logging.info(f"Removed tag '{tag}' from {file_path}")
+
+    def _remove_tag_from_frontmatter(self, tag, content, file_path):
+        """Remove a specific tag from a file's YAML frontmatter. Returns (content, modified)."""
+        modified = False
+        
+        # Handle tags in YAML frontmatter
+        frontmatter, frontmatter_start, frontmatter_end = _split_frontmatter(content)
+        if frontmatter is not None:
+            field = _parse_tags_field(frontmatter)
+            if field is not None:
+                # Rewrite just the tags field, keeping the rest of the frontmatter byte-identical
+                tags, start, end, style = field
+                tag_list = [t.strip() for t in tags.split(',')] if isinstance(tags, str) else tags or []
+                try:
+                    index = tag_list.index(tag)
+                except ValueError:
+                    return content, False
+                remaining = tag_list[:index] + tag_list[index + 1:]
                 
-        except Exception as e:
-            logging.error(f"Error removing tag '{tag}' from {file_path}: {str(e)}")
+                field_lines = frontmatter[start:end].split('\n')
+                if not remaining:
+                    field_lines = []
+                elif style == 'block':
+                    del field_lines[1 + index]
+                elif style == 'flow':
+                    field_lines[0] = f"tags: [{', '.join(remaining)}]"
+                else:
+                    field_lines[0] = f"tags: {', '.join(remaining)}"
+                head = frontmatter[:start]
+                if not field_lines and end == len(frontmatter):
+                    head = head.rstrip('\n')  # The field was the last one, drop the line break before it
+                new_frontmatter = head + '\n'.join(field_lines) + frontmatter[end:]
+                new_content = content[:frontmatter_start] + new_frontmatter + content[frontmatter_start + len(frontmatter):]
+                return new_content, True
+            
+            try:
+                metadata = yaml.load(frontmatter, Loader=_YamlLoader)
+                if metadata and 'tags' in metadata:
+                    if isinstance(metadata['tags'], list) and tag in metadata['tags']:
+                        metadata['tags'].remove(tag)
+                        modified = True
+                        # If tags list is now empty, remove the tags field
+                        if not metadata['tags']:
+                            del metadata['tags']
+                    elif isinstance(metadata['tags'], str):
+                        tag_list = [t.strip() for t in metadata['tags'].split(',')]
+                        if tag in tag_list:
+                            tag_list.remove(tag)
+                            metadata['tags'] = ', '.join(tag_list) if tag_list else None
+                            if metadata['tags'] is None:
+                                del metadata['tags']
+                            modified = True
+                
+                # Rebuild the frontmatter
+                if modified:
+                    new_frontmatter = yaml.dump(metadata, Dumper=_YamlDumper, default_flow_style=False, sort_keys=False)
+                    new_content = f"---\n{new_frontmatter}---\n{content[frontmatter_end+3:]}"
+                    content = new_content
+            except yaml.YAMLError:
+                logging.warning(f"Error parsing YAML frontmatter in {file_path}")
+        
+        return content, modified
 
     def print_summary(self):
         """Print a summary of the tag cleanup operation."""